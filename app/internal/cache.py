@@ -0,0 +1,76 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import copy
+import functools
+import inspect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 进程内查询结果缓存：键包含当前代数，写入路径调用 bump_generation() 后旧键自然失效
+_cache: Dict[Tuple, Tuple[float, Any]] = {}
+_cache_lock = threading.Lock()
+_generation = 0
+
+# 缓存条目上限，超出时先清理过期条目，仍超出则整体清空
+MAX_ENTRIES = 1024
+
+def bump_generation() -> None:
+    """
+    使所有已缓存的查询结果失效
+
+    在帖子爬取、同步等写入数据库的操作完成后调用
+    """
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        _cache.clear()
+    logger.debug(f"查询缓存已失效，当前代数: {_generation}")
+
+def ttl_cached(ttl: float = 30, skip: Optional[Callable[..., bool]] = None):
+    """
+    为查询函数添加带过期时间的进程内缓存
+
+    缓存命中的结果由多个请求共用：每次调用返回顶层列表/字典的浅拷贝，
+    调用方可以增删顶层键或元素，但不得修改其中嵌套的对象（如各条线程记录）
+
+    Args:
+        ttl: 缓存有效期（秒）
+        skip: 接收与被装饰函数相同参数的判断函数，返回True时不读写缓存
+
+    Returns:
+        装饰器
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if skip is not None and skip(**bound.arguments):
+                return func(*args, **kwargs)
+
+            key = (func.__qualname__, _generation, tuple(bound.arguments.items()))
+            now = time.monotonic()
+            entry = _cache.get(key)
+            if entry is not None and entry[0] > now:
+                return copy.copy(entry[1])
+
+            result = func(*args, **kwargs)
+            # 不缓存空结果，避免新爬取的线程在有效期内被误判为不存在
+            if result is not None:
+                with _cache_lock:
+                    if len(_cache) >= MAX_ENTRIES:
+                        for stale_key in [k for k, v in _cache.items() if v[0] <= now]:
+                            del _cache[stale_key]
+                        if len(_cache) >= MAX_ENTRIES:
+                            _cache.clear()
+                    if key[1] == _generation:
+                        _cache[key] = (now + ttl, result)
+                return copy.copy(result)
+            return result
+
+        return wrapper
+    return decorator
@@ -1,109 +1,151 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+import base64
 from datetime import datetime
 
-from db.postgre import PostgreSQLManager
+# 数据库管理器在进程内按配置文件共享，与爬虫使用同一个连接池
+from db.postgre import get_shared_manager as _get_manager, close_shared_managers as close_managers
+from app.internal.cache import ttl_cached
 
 logger = logging.getLogger(__name__)
 
+# 热点查询均通过 execute_prepared 以服务端预备语句执行，SQL使用 $n 占位符；
+# 修改某条SQL时需同时提升其语句名的版本后缀，避免与连接上已PREPARE的旧语句冲突
+
+# bunkr链接匹配规则（PostgreSQL正则）
+BUNKR_LINK_PATTERN = r'bunkr\.\w+'
+
+def encode_threads_cursor(sort_timestamp: int, thread_id: int) -> str:
+    """将线程列表最后一行的 (排序时间戳, ID) 编码为翻页游标"""
+    return base64.urlsafe_b64encode(f"{sort_timestamp}:{thread_id}".encode()).decode()
+
+def decode_threads_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    解析线程列表翻页游标
+    
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        sort_timestamp, thread_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return int(sort_timestamp), int(thread_id)
+    except Exception:
+        raise ValueError(f"无效的翻页游标: {cursor}")
+
+# 深分页请求命中率低，不写入缓存
+@ttl_cached(ttl=30, skip=lambda **kw: kw["offset"] > 500)
 def get_threads_list(
     limit: int = 50,
     offset: int = 0,
-    config_path: str = "config.yaml"
+    config_path: str = "config.yaml",
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     从PostgreSQL数据库中获取线程列表 - 适配新的三表结构
     
     Args:
         limit: 返回的线程数量限制
-        offset: 偏移量
+        offset: 偏移量（仅在未提供cursor时生效）
         config_path: 配置文件路径
+        cursor: 翻页游标，取上一页返回的next_cursor（键集分页）
         
     Returns:
-        包含线程列表和总数的字典
+        包含线程列表、总数和下一页游标的字典
+        
+    Raises:
+        ValueError: 游标格式不正确
     """
+    # 按 (最新回复时间, ID) 倒序排列；没有帖子的线程时间戳按 -1 处理，与 NULLS LAST 的顺序一致
+    if cursor is not None:
+        cursor_timestamp, cursor_id = decode_threads_cursor(cursor)
+        offset = 0
+    else:
+        cursor_timestamp, cursor_id = None, None
+    
     try:
-        db_manager = PostgreSQLManager(config_path)
+        db_manager = _get_manager(config_path)
         
-        # 获取线程统计信息的SQL查询
+        # 获取线程统计信息的SQL查询（列名与返回字段一致，行直接作为结果返回）
+        # 统计列由 simpcity_thread_response 上的触发器维护（见 db/migrations/002），无需JOIN聚合
+        # 提供游标时按 (sort_timestamp, id) 走键集分页（索引见 db/migrations/004），避免OFFSET扫描并丢弃前面的行
+        # 总数由独立的标量子查询计算，不影响主查询在取够limit行后提前结束
         threads_query = """
             SELECT 
                 tm.id,
                 tm.name as thread_title,
                 tm.url as thread_url,
-                tm.uuid as thread_uuid,
+                tm.uuid::text as thread_uuid,
                 tm.categories,
                 tm.tags,
                 tm.avatar_img,
                 tm.description,
                 tm.create_time,
                 tm.update_time,
-                COUNT(tr.id) as posts_count,
-                MAX(tr.post_timestamp) as latest_post_timestamp,
-                MIN(tr.post_timestamp) as first_post_timestamp,
-                COUNT(DISTINCT tr.author_id) as authors_count
+                tm.posts_count,
+                tm.latest_post_timestamp::text as latest_post_timestamp,
+                tm.first_post_timestamp::text as first_post_timestamp,
+                tm.authors_count,
+                COALESCE(tm.latest_post_timestamp, -1) as sort_timestamp,
+                (SELECT COUNT(*) FROM simpcity_thread_metadata WHERE is_deleted = false) as total_count
             FROM simpcity_thread_metadata tm
-            LEFT JOIN simpcity_thread_response tr ON tm.uuid = tr.thread_uuid 
-                AND tr.is_deleted = false
             WHERE tm.is_deleted = false
-            GROUP BY tm.id, tm.uuid, tm.name, tm.url, tm.categories, tm.tags, tm.avatar_img, tm.description, tm.create_time, tm.update_time
-            ORDER BY MAX(tr.post_timestamp) DESC NULLS LAST
-            LIMIT %s OFFSET %s
+                AND ($3::bigint IS NULL OR (COALESCE(tm.latest_post_timestamp, -1), tm.id) < ($3, $4::bigint))
+            ORDER BY COALESCE(tm.latest_post_timestamp, -1) DESC, tm.id DESC
+            LIMIT $1 OFFSET $2
         """
         
-        # 获取总线程数的SQL查询
-        count_query = """
-            SELECT COUNT(*) as total_count
-            FROM simpcity_thread_metadata 
-            WHERE is_deleted = false
-        """
+        # 执行查询（总数随数据行一并返回）
+        threads_result = db_manager.execute_prepared(
+            "threads_list_v3",
+            ("int", "int", "bigint", "bigint"),
+            threads_query,
+            (limit, offset, cursor_timestamp, cursor_id)
+        )
+        
+        if threads_result:
+            total_count = threads_result[0]["total_count"]
+        elif offset > 0 or cursor is not None:
+            # 偏移量越界或已翻到末页时数据行为空，单独补查总数
+            count_query = """
+                SELECT COUNT(*) as total_count
+                FROM simpcity_thread_metadata 
+                WHERE is_deleted = false
+            """
+            count_result = db_manager.execute_one(count_query)
+            total_count = count_result["total_count"] if count_result else 0
+        else:
+            total_count = 0
         
-        # 执行查询
-        threads_result = db_manager.execute_query(threads_query, (limit, offset))
-        count_result = db_manager.execute_one(count_query)
-        
-        # 格式化结果
-        threads_list = []
-        for thread in threads_result:
-            thread_info = {
-                "id": thread["id"],
-                "thread_title": thread["thread_title"],
-                "thread_url": thread["thread_url"],
-                "thread_uuid": str(thread["thread_uuid"]),
-                "categories": thread["categories"],
-                "tags": thread["tags"],
-                "avatar_img": thread["avatar_img"],
-                "description": thread["description"],
-                "create_time": thread["create_time"].isoformat() if thread["create_time"] else None,
-                "update_time": thread["update_time"].isoformat() if thread["update_time"] else None,
-                "posts_count": thread["posts_count"] or 0,
-                "latest_post_timestamp": str(thread["latest_post_timestamp"]) if thread["latest_post_timestamp"] else None,
-                "first_post_timestamp": str(thread["first_post_timestamp"]) if thread["first_post_timestamp"] else None,
-                "authors_count": thread["authors_count"] or 0
-            }
-            threads_list.append(thread_info)
-        
-        total_count = count_result["total_count"] if count_result else 0
+        next_cursor = None
+        if threads_result and len(threads_result) == limit:
+            last = threads_result[-1]
+            next_cursor = encode_threads_cursor(last["sort_timestamp"], last["id"])
+        
+        # 行直接作为结果返回，datetime 由响应层编码
+        threads_list = threads_result
+        for thread in threads_list:
+            del thread["total_count"]
+            del thread["sort_timestamp"]
         
         logger.info(f"获取线程列表成功 - 返回 {len(threads_list)} 个线程，总数: {total_count}")
         
         return {
             "threads": threads_list,
-            "total_count": total_count
+            "total_count": total_count,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
         logger.error(f"获取线程列表失败: {str(e)}")
         raise e
-    finally:
-        if 'db_manager' in locals():
-            db_manager.close_all_connections()
 
 def get_thread_posts(
     thread_url: str,
     limit: int = 50,
     offset: int = 0,
-    config_path: str = "config.yaml"
+    config_path: str = "config.yaml",
+    after_floor: Optional[int] = None,
+    include_html: bool = True
 ) -> Dict[str, Any]:
     """
     获取指定线程的帖子列表 - 适配新的三表结构
@@ -111,85 +153,119 @@ def get_thread_posts(
     Args:
         thread_url: 线程URL
         limit: 返回的帖子数量限制
-        offset: 偏移量
+        offset: 偏移量（仅在未提供after_floor时生效）
         config_path: 配置文件路径
+        after_floor: 游标，返回楼层号大于该值的帖子（键集分页）
+        include_html: 是否返回content_html，为False时该字段为None以减少传输量
         
     Returns:
-        包含帖子列表和总数的字典
+        包含帖子列表、总数和下一页游标的字典
     """
     try:
-        db_manager = PostgreSQLManager(config_path)
+        db_manager = _get_manager(config_path)
         
         # 获取帖子列表的SQL查询（包含反应数据）
+        # 列名与返回字段一致，行直接作为结果返回，datetime/UUID 由响应层编码
+        # 提供after_floor时按楼层号走键集分页，避免OFFSET扫描并丢弃前面的行
+        # 先在子查询内完成分页，再用LATERAL逐行查反应数据，反应表只会被查询本页的至多limit次
         posts_query = """
             SELECT 
-                tr.*,
-                trc.reactions
-            FROM simpcity_thread_response tr
-            JOIN simpcity_thread_metadata tm ON tr.thread_uuid = tm.uuid
-            LEFT JOIN simpcity_thread_reactions trc ON tr.uuid = trc.post_uuid
-            WHERE tm.url = %s
-                AND tr.is_deleted = false
-                AND tm.is_deleted = false
-            ORDER BY tr.floor ASC
-            LIMIT %s OFFSET %s
+                p.id,
+                p.uuid,
+                p.thread_uuid,
+                p.post_id,
+                p.author_name,
+                p.author_id,
+                p.author_profile_url,
+                p.post_timestamp,
+                p.content_text,
+                p.content_html,
+                p.image_urls,
+                p.external_links,
+                p.iframe_urls,
+                p.floor,
+                trc.reactions,
+                p.create_time,
+                p.update_time,
+                p.is_deleted,
+                p.total_count
+            FROM (
+                SELECT 
+                    tr.id,
+                    tr.uuid,
+                    tr.thread_uuid,
+                    tr.post_id,
+                    tr.author_name,
+                    tr.author_id,
+                    tr.author_profile_url,
+                    tr.post_timestamp,
+                    tr.content_text,
+                    CASE WHEN $5 THEN tr.content_html END as content_html,
+                    COALESCE(tr.image_urls, '[]') as image_urls,
+                    COALESCE(tr.external_links, '[]') as external_links,
+                    COALESCE(tr.iframe_urls, '[]') as iframe_urls,
+                    tr.floor,
+                    tr.create_time,
+                    tr.update_time,
+                    tr.is_deleted,
+                    tm.posts_count as total_count
+                FROM simpcity_thread_response tr
+                JOIN simpcity_thread_metadata tm ON tr.thread_uuid = tm.uuid
+                WHERE tm.url = $1
+                    AND tr.is_deleted = false
+                    AND tm.is_deleted = false
+                    AND ($2::bigint IS NULL OR tr.floor > $2)
+                ORDER BY tr.floor ASC
+                LIMIT $3 OFFSET $4
+            ) p
+            LEFT JOIN LATERAL (
+                SELECT reactions FROM simpcity_thread_reactions
+                WHERE post_uuid = p.uuid
+            ) trc ON true
+            ORDER BY p.floor ASC
         """
         
-        # 获取总帖子数的SQL查询
-        count_query = """
-            SELECT COUNT(*) as total_count
-            FROM simpcity_thread_response tr
-            JOIN simpcity_thread_metadata tm ON tr.thread_uuid = tm.uuid
-            WHERE tm.url = %s
-                AND tr.is_deleted = false
-                AND tm.is_deleted = false
-        """
+        # 执行查询（总数取自触发器维护的 posts_count，随数据行一并返回）
+        if after_floor is not None:
+            offset = 0
+        posts_result = db_manager.execute_prepared(
+            "thread_posts_v5",
+            ("text", "bigint", "int", "int", "boolean"),
+            posts_query,
+            (thread_url, after_floor, limit, offset, include_html)
+        )
+        
+        if posts_result:
+            total_count = posts_result[0]["total_count"]
+            for post in posts_result:
+                del post["total_count"]
+        else:
+            # 没有数据行时单独补查总数
+            count_query = """
+                SELECT posts_count as total_count
+                FROM simpcity_thread_metadata
+                WHERE url = %s AND is_deleted = false
+            """
+            count_result = db_manager.execute_one(count_query, (thread_url,))
+            total_count = count_result["total_count"] if count_result else 0
         
-        # 执行查询
-        posts_result = db_manager.execute_query(posts_query, (thread_url, limit, offset))
-        count_result = db_manager.execute_one(count_query, (thread_url,))
+        formatted_posts = posts_result
         
-        # 格式化帖子数据
-        formatted_posts = []
-        for post in posts_result:
-            formatted_post = {
-                "id": post["id"],
-                "uuid": str(post["uuid"]),
-                "thread_uuid": str(post["thread_uuid"]),
-                "post_id": post["post_id"],
-                "author_name": post["author_name"],
-                "author_id": post["author_id"],
-                "author_profile_url": post["author_profile_url"],
-                "post_timestamp": post["post_timestamp"],
-                "content_text": post["content_text"],
-                "content_html": post["content_html"],
-                "image_urls": post["image_urls"] or [],
-                "external_links": post["external_links"] or [],
-                "iframe_urls": post["iframe_urls"] or [],
-                "floor": post["floor"],
-                "reactions": post["reactions"],
-                "create_time": post["create_time"].isoformat() if post["create_time"] else None,
-                "update_time": post["update_time"].isoformat() if post["update_time"] else None,
-                "is_deleted": post["is_deleted"]
-            }
-            formatted_posts.append(formatted_post)
-        
-        total_count = count_result["total_count"] if count_result else 0
+        next_cursor = formatted_posts[-1]["floor"] if len(formatted_posts) == limit else None
         
         logger.info(f"获取线程 {thread_url} 的帖子列表成功 - 返回 {len(formatted_posts)} 个帖子，总数: {total_count}")
         
         return {
             "posts": formatted_posts,
-            "total_count": total_count
+            "total_count": total_count,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
         logger.error(f"获取线程帖子列表失败: {str(e)}")
         raise e
-    finally:
-        if 'db_manager' in locals():
-            db_manager.close_all_connections()
 
+@ttl_cached(ttl=30)
 def get_thread_info(
     thread_url: str,
     config_path: str = "config.yaml"
@@ -205,52 +281,37 @@ def get_thread_info(
         线程信息字典或None
     """
     try:
-        db_manager = PostgreSQLManager(config_path)
+        db_manager = _get_manager(config_path)
         
-        # 获取线程信息的SQL查询
+        # 获取线程信息的SQL查询（统计列由触发器维护，无需JOIN聚合）
         thread_info_query = """
             SELECT 
                 tm.name as thread_title,
                 tm.url as thread_url,
-                tm.uuid as thread_uuid,
+                tm.uuid::text as thread_uuid,
                 tm.categories,
                 tm.tags,
                 tm.avatar_img,
                 tm.description,
                 tm.create_time,
                 tm.update_time,
-                COUNT(tr.id) as posts_count,
-                MAX(tr.post_timestamp) as latest_post_timestamp,
-                MIN(tr.post_timestamp) as first_post_timestamp,
-                COUNT(DISTINCT tr.author_id) as authors_count
+                tm.posts_count,
+                tm.latest_post_timestamp::text as latest_post_timestamp,
+                tm.first_post_timestamp::text as first_post_timestamp,
+                tm.authors_count
             FROM simpcity_thread_metadata tm
-            LEFT JOIN simpcity_thread_response tr ON tm.uuid = tr.thread_uuid 
-                AND tr.is_deleted = false
-            WHERE tm.url = %s
+            WHERE tm.url = $1
                 AND tm.is_deleted = false
-            GROUP BY tm.uuid, tm.name, tm.url, tm.categories, tm.tags, tm.avatar_img, tm.description, tm.create_time, tm.update_time
         """
         
         # 执行查询
-        result = db_manager.execute_one(thread_info_query, (thread_url,))
+        result = db_manager.execute_prepared(
+            "thread_info_v3", ("text",), thread_info_query, (thread_url,), fetch_one=True
+        )
         
         if result:
             logger.info(f"获取线程 {thread_url} 的信息成功")
-            return {
-                "thread_title": result["thread_title"],
-                "thread_url": result["thread_url"],
-                "thread_uuid": str(result["thread_uuid"]),
-                "categories": result["categories"],
-                "tags": result["tags"],
-                "avatar_img": result["avatar_img"],
-                "description": result["description"],
-                "create_time": result["create_time"].isoformat() if result["create_time"] else None,
-                "update_time": result["update_time"].isoformat() if result["update_time"] else None,
-                "posts_count": result["posts_count"] or 0,
-                "latest_post_timestamp": str(result["latest_post_timestamp"]) if result["latest_post_timestamp"] else None,
-                "first_post_timestamp": str(result["first_post_timestamp"]) if result["first_post_timestamp"] else None,
-                "authors_count": result["authors_count"] or 0
-            }
+            return result
         else:
             logger.warning(f"未找到线程 {thread_url}")
             return None
@@ -258,10 +319,8 @@ def get_thread_info(
     except Exception as e:
         logger.error(f"获取线程信息失败: {str(e)}")
         raise e
-    finally:
-        if 'db_manager' in locals():
-            db_manager.close_all_connections()
 
+@ttl_cached(ttl=30)
 def get_thread_info_by_id(
     thread_id: int,
     config_path: str = "config.yaml"
@@ -277,54 +336,38 @@ def get_thread_info_by_id(
         线程信息字典或None
     """
     try:
-        db_manager = PostgreSQLManager(config_path)
+        db_manager = _get_manager(config_path)
         
-        # 获取线程信息的SQL查询 - 使用ID而不是URL
+        # 获取线程信息的SQL查询 - 使用ID而不是URL（统计列由触发器维护，无需JOIN聚合）
         thread_info_query = """
             SELECT 
                 tm.id,
                 tm.name as thread_title,
                 tm.url as thread_url,
-                tm.uuid as thread_uuid,
+                tm.uuid::text as thread_uuid,
                 tm.categories,
                 tm.tags,
                 tm.avatar_img,
                 tm.description,
                 tm.create_time,
                 tm.update_time,
-                COUNT(tr.id) as posts_count,
-                MAX(tr.post_timestamp) as latest_post_timestamp,
-                MIN(tr.post_timestamp) as first_post_timestamp,
-                COUNT(DISTINCT tr.author_id) as authors_count
+                tm.posts_count,
+                tm.latest_post_timestamp::text as latest_post_timestamp,
+                tm.first_post_timestamp::text as first_post_timestamp,
+                tm.authors_count
             FROM simpcity_thread_metadata tm
-            LEFT JOIN simpcity_thread_response tr ON tm.uuid = tr.thread_uuid 
-                AND tr.is_deleted = false
-            WHERE tm.id = %s
+            WHERE tm.id = $1
                 AND tm.is_deleted = false
-            GROUP BY tm.id, tm.uuid, tm.name, tm.url, tm.categories, tm.tags, tm.avatar_img, tm.description, tm.create_time, tm.update_time
         """
         
         # 执行查询
-        result = db_manager.execute_one(thread_info_query, (thread_id,))
+        result = db_manager.execute_prepared(
+            "thread_info_by_id_v3", ("bigint",), thread_info_query, (thread_id,), fetch_one=True
+        )
         
         if result:
             logger.info(f"获取线程 ID {thread_id} 的信息成功")
-            return {
-                "id": result["id"],
-                "thread_title": result["thread_title"],
-                "thread_url": result["thread_url"],
-                "thread_uuid": str(result["thread_uuid"]),
-                "categories": result["categories"],
-                "tags": result["tags"],
-                "avatar_img": result["avatar_img"],
-                "description": result["description"],
-                "create_time": result["create_time"].isoformat() if result["create_time"] else None,
-                "update_time": result["update_time"].isoformat() if result["update_time"] else None,
-                "posts_count": result["posts_count"] or 0,
-                "latest_post_timestamp": str(result["latest_post_timestamp"]) if result["latest_post_timestamp"] else None,
-                "first_post_timestamp": str(result["first_post_timestamp"]) if result["first_post_timestamp"] else None,
-                "authors_count": result["authors_count"] or 0
-            }
+            return result
         else:
             logger.warning(f"未找到线程 ID {thread_id}")
             return None
@@ -332,15 +375,14 @@ def get_thread_info_by_id(
     except Exception as e:
         logger.error(f"获取线程信息失败: {str(e)}")
         raise e
-    finally:
-        if 'db_manager' in locals():
-            db_manager.close_all_connections()
 
 def get_thread_posts_by_id(
     thread_id: int,
     limit: int = 50,
     offset: int = 0,
-    config_path: str = "config.yaml"
+    config_path: str = "config.yaml",
+    after_floor: Optional[int] = None,
+    include_html: bool = True
 ) -> Optional[Dict[str, Any]]:
     """
     根据线程ID获取帖子列表 - 使用数据库自增ID
@@ -348,92 +390,468 @@ def get_thread_posts_by_id(
     Args:
         thread_id: 线程的数据库自增ID
         limit: 返回的帖子数量限制
-        offset: 偏移量
+        offset: 偏移量（仅在未提供after_floor时生效）
         config_path: 配置文件路径
+        after_floor: 游标，返回楼层号大于该值的帖子（键集分页）
+        include_html: 是否返回content_html，为False时该字段为None以减少传输量
         
     Returns:
-        包含帖子列表和总数的字典，如果线程不存在则返回None
+        包含帖子列表、总数和下一页游标的字典，如果线程不存在则返回None
     """
     try:
-        db_manager = PostgreSQLManager(config_path)
+        db_manager = _get_manager(config_path)
         
-        # 首先验证线程是否存在
-        thread_check_query = """
-            SELECT id FROM simpcity_thread_metadata 
-            WHERE id = %s AND is_deleted = false
+        # 获取帖子列表的SQL查询（包含反应数据）- 由CTE按ID解析出线程uuid，存在性检查与取帖子合并为一次查询
+        # 列名与返回字段一致，行直接作为结果返回，datetime/UUID 由响应层编码
+        # 提供after_floor时按楼层号走键集分页，避免OFFSET扫描并丢弃前面的行
+        # 先在子查询内完成分页，再用LATERAL逐行查反应数据，反应表只会被查询本页的至多limit次
+        posts_query = """
+            WITH t AS (
+                SELECT uuid, posts_count FROM simpcity_thread_metadata
+                WHERE id = $1 AND is_deleted = false
+            )
+            SELECT 
+                p.id,
+                p.uuid,
+                p.thread_uuid,
+                p.post_id,
+                p.author_name,
+                p.author_id,
+                p.author_profile_url,
+                p.post_timestamp,
+                p.content_text,
+                p.content_html,
+                p.image_urls,
+                p.external_links,
+                p.iframe_urls,
+                p.floor,
+                trc.reactions,
+                p.create_time,
+                p.update_time,
+                p.is_deleted,
+                p.total_count
+            FROM (
+                SELECT 
+                    tr.id,
+                    tr.uuid,
+                    tr.thread_uuid,
+                    tr.post_id,
+                    tr.author_name,
+                    tr.author_id,
+                    tr.author_profile_url,
+                    tr.post_timestamp,
+                    tr.content_text,
+                    CASE WHEN $5 THEN tr.content_html END as content_html,
+                    COALESCE(tr.image_urls, '[]') as image_urls,
+                    COALESCE(tr.external_links, '[]') as external_links,
+                    COALESCE(tr.iframe_urls, '[]') as iframe_urls,
+                    tr.floor,
+                    tr.create_time,
+                    tr.update_time,
+                    tr.is_deleted,
+                    t.posts_count as total_count
+                FROM t
+                JOIN simpcity_thread_response tr ON tr.thread_uuid = t.uuid
+                WHERE tr.is_deleted = false
+                    AND ($2::bigint IS NULL OR tr.floor > $2)
+                ORDER BY tr.floor ASC
+                LIMIT $3 OFFSET $4
+            ) p
+            LEFT JOIN LATERAL (
+                SELECT reactions FROM simpcity_thread_reactions
+                WHERE post_uuid = p.uuid
+            ) trc ON true
+            ORDER BY p.floor ASC
         """
-        thread_exists = db_manager.execute_one(thread_check_query, (thread_id,))
         
-        if not thread_exists:
-            logger.warning(f"线程 ID {thread_id} 不存在")
-            return None
+        # 执行查询（总数取自触发器维护的 posts_count，随数据行一并返回）
+        if after_floor is not None:
+            offset = 0
+        posts_result = db_manager.execute_prepared(
+            "thread_posts_by_id_v7",
+            ("bigint", "bigint", "int", "int", "boolean"),
+            posts_query,
+            (thread_id, after_floor, limit, offset, include_html)
+        )
+        
+        if posts_result:
+            total_count = posts_result[0]["total_count"]
+            for post in posts_result:
+                del post["total_count"]
+        else:
+            # 没有数据行时才单独确认线程是否存在
+            thread_check_query = """
+                SELECT posts_count FROM simpcity_thread_metadata 
+                WHERE id = %s AND is_deleted = false
+            """
+            thread_exists = db_manager.execute_one(thread_check_query, (thread_id,))
+            
+            if not thread_exists:
+                logger.warning(f"线程 ID {thread_id} 不存在")
+                return None
+            
+            total_count = thread_exists["posts_count"]
+        
+        formatted_posts = posts_result
         
-        # 获取帖子列表的SQL查询（包含反应数据）- 使用ID而不是URL
+        next_cursor = formatted_posts[-1]["floor"] if len(formatted_posts) == limit else None
+        
+        logger.info(f"获取线程 ID {thread_id} 的帖子列表成功 - 返回 {len(formatted_posts)} 个帖子，总数: {total_count}")
+        
+        return {
+            "posts": formatted_posts,
+            "total_count": total_count,
+            "next_cursor": next_cursor
+        }
+        
+    except Exception as e:
+        logger.error(f"获取线程帖子列表失败: {str(e)}")
+        raise e
+
+def get_thread_posts_summary(
+    thread_id: int,
+    limit: int = 50,
+    offset: int = 0,
+    config_path: str = "config.yaml",
+    after_floor: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    根据线程ID获取帖子摘要列表 - 只返回列表展示所需的字段
+    
+    不读取 content_html、链接列表和反应数据，完整内容通过 get_post_by_uuid 单独获取
+    
+    Args:
+        thread_id: 线程的数据库自增ID
+        limit: 返回的帖子数量限制
+        offset: 偏移量（仅在未提供after_floor时生效）
+        config_path: 配置文件路径
+        after_floor: 游标，返回楼层号大于该值的帖子（键集分页）
+        
+    Returns:
+        包含帖子摘要列表、总数和下一页游标的字典，如果线程不存在则返回None
+    """
+    try:
+        db_manager = _get_manager(config_path)
+        
+        # 获取帖子摘要的SQL查询 - content_text 只截取前200个字符作为预览
         posts_query = """
+            WITH t AS (
+                SELECT uuid, posts_count FROM simpcity_thread_metadata
+                WHERE id = $1 AND is_deleted = false
+            )
             SELECT 
-                tr.*,
-                trc.reactions
-            FROM simpcity_thread_response tr
-            JOIN simpcity_thread_metadata tm ON tr.thread_uuid = tm.uuid
-            LEFT JOIN simpcity_thread_reactions trc ON tr.uuid = trc.post_uuid
-            WHERE tm.id = %s
-                AND tr.is_deleted = false
-                AND tm.is_deleted = false
+                tr.id,
+                tr.uuid,
+                tr.author_name,
+                tr.author_id,
+                tr.post_timestamp,
+                tr.floor,
+                LEFT(tr.content_text, 200) as preview,
+                jsonb_array_length(COALESCE(tr.image_urls, '[]')) as image_count,
+                t.posts_count as total_count
+            FROM t
+            JOIN simpcity_thread_response tr ON tr.thread_uuid = t.uuid
+            WHERE tr.is_deleted = false
+                AND ($2::bigint IS NULL OR tr.floor > $2)
             ORDER BY tr.floor ASC
-            LIMIT %s OFFSET %s
+            LIMIT $3 OFFSET $4
         """
         
-        # 获取总帖子数的SQL查询
-        count_query = """
-            SELECT COUNT(*) as total_count
+        if after_floor is not None:
+            offset = 0
+        posts_result = db_manager.execute_prepared(
+            "thread_posts_summary_v1",
+            ("bigint", "bigint", "int", "int"),
+            posts_query,
+            (thread_id, after_floor, limit, offset)
+        )
+        
+        if posts_result:
+            total_count = posts_result[0]["total_count"]
+            for post in posts_result:
+                del post["total_count"]
+        else:
+            # 没有数据行时才单独确认线程是否存在
+            thread_check_query = """
+                SELECT posts_count FROM simpcity_thread_metadata 
+                WHERE id = %s AND is_deleted = false
+            """
+            thread_exists = db_manager.execute_one(thread_check_query, (thread_id,))
+            
+            if not thread_exists:
+                logger.warning(f"线程 ID {thread_id} 不存在")
+                return None
+            
+            total_count = thread_exists["posts_count"]
+        
+        next_cursor = posts_result[-1]["floor"] if len(posts_result) == limit else None
+        
+        logger.info(f"获取线程 ID {thread_id} 的帖子摘要成功 - 返回 {len(posts_result)} 个帖子，总数: {total_count}")
+        
+        return {
+            "posts": posts_result,
+            "total_count": total_count,
+            "next_cursor": next_cursor
+        }
+        
+    except Exception as e:
+        logger.error(f"获取线程帖子摘要失败: {str(e)}")
+        raise e
+
+def get_post_by_uuid(
+    post_uuid: str,
+    config_path: str = "config.yaml"
+) -> Optional[Dict[str, Any]]:
+    """
+    根据帖子UUID获取单个帖子的完整内容
+    
+    Args:
+        post_uuid: 帖子UUID
+        config_path: 配置文件路径
+        
+    Returns:
+        帖子信息字典或None
+    """
+    try:
+        db_manager = _get_manager(config_path)
+        
+        post_query = """
+            SELECT 
+                tr.id,
+                tr.uuid,
+                tr.thread_uuid,
+                tr.post_id,
+                tr.author_name,
+                tr.author_id,
+                tr.author_profile_url,
+                tr.post_timestamp,
+                tr.content_text,
+                tr.content_html,
+                COALESCE(tr.image_urls, '[]') as image_urls,
+                COALESCE(tr.external_links, '[]') as external_links,
+                COALESCE(tr.iframe_urls, '[]') as iframe_urls,
+                tr.floor,
+                trc.reactions,
+                tr.create_time,
+                tr.update_time,
+                tr.is_deleted
             FROM simpcity_thread_response tr
-            JOIN simpcity_thread_metadata tm ON tr.thread_uuid = tm.uuid
-            WHERE tm.id = %s
+            LEFT JOIN simpcity_thread_reactions trc ON tr.uuid = trc.post_uuid
+            WHERE tr.uuid = $1
                 AND tr.is_deleted = false
+        """
+        
+        result = db_manager.execute_prepared(
+            "post_by_uuid_v1", ("unknown",), post_query, (post_uuid,), fetch_one=True
+        )
+        
+        if result:
+            logger.info(f"获取帖子 {post_uuid} 成功")
+        else:
+            logger.warning(f"未找到帖子 {post_uuid}")
+        return result
+        
+    except Exception as e:
+        logger.error(f"获取帖子失败: {str(e)}")
+        raise e
+
+def get_bunkr_links_for_post(
+    post_id: str,
+    thread_url: str,
+    config_path: str = "config.yaml"
+) -> Optional[List[str]]:
+    """
+    获取指定帖子外部链接中的bunkr链接
+    
+    在数据库中展开 external_links 并按正则过滤，只返回匹配的链接，不取回帖子的其余内容
+    
+    Args:
+        post_id: 帖子ID
+        thread_url: 线程URL
+        config_path: 配置文件路径
+        
+    Returns:
+        按原顺序排列的bunkr链接列表，帖子不存在时返回None
+    """
+    try:
+        db_manager = _get_manager(config_path)
+        
+        links_query = """
+            SELECT COALESCE(
+                (
+                    SELECT jsonb_agg(link ORDER BY ord)
+                    FROM jsonb_array_elements_text(COALESCE(r.external_links, '[]')) WITH ORDINALITY AS e(link, ord)
+                    WHERE link ~ $3
+                ),
+                '[]'
+            ) AS bunkr_links
+            FROM simpcity_thread_response r
+            JOIN simpcity_thread_metadata t ON r.thread_uuid = t.uuid
+            WHERE r.post_id = $1 AND t.url = $2 AND r.is_deleted = FALSE
+        """
+        
+        result = db_manager.execute_prepared(
+            "post_bunkr_links_v1",
+            ("unknown", "unknown", "text"),
+            links_query,
+            (post_id, thread_url, BUNKR_LINK_PATTERN),
+            fetch_one=True
+        )
+        
+        if not result:
+            logger.warning(f"未找到帖子 {post_id}，线程: {thread_url}")
+            return None
+        return result["bunkr_links"]
+        
+    except Exception as e:
+        logger.error(f"获取帖子 {post_id} 的bunkr链接失败: {str(e)}")
+        raise e
+
+def get_threads_by_ids(
+    thread_ids: List[int],
+    config_path: str = "config.yaml"
+) -> List[Dict[str, Any]]:
+    """
+    批量获取多个线程的基本信息 - 一次查询返回全部线程
+    
+    Args:
+        thread_ids: 线程的数据库自增ID列表
+        config_path: 配置文件路径
+        
+    Returns:
+        线程信息列表（不存在的ID会被忽略）
+    """
+    try:
+        db_manager = _get_manager(config_path)
+        
+        threads_query = """
+            SELECT 
+                tm.id,
+                tm.name as thread_title,
+                tm.url as thread_url,
+                tm.uuid::text as thread_uuid,
+                tm.categories,
+                tm.tags,
+                tm.avatar_img,
+                tm.description,
+                tm.create_time,
+                tm.update_time,
+                tm.posts_count,
+                tm.latest_post_timestamp::text as latest_post_timestamp,
+                tm.first_post_timestamp::text as first_post_timestamp,
+                tm.authors_count
+            FROM simpcity_thread_metadata tm
+            WHERE tm.id = ANY($1)
                 AND tm.is_deleted = false
         """
         
-        # 执行查询
-        posts_result = db_manager.execute_query(posts_query, (thread_id, limit, offset))
-        count_result = db_manager.execute_one(count_query, (thread_id,))
+        threads_result = db_manager.execute_prepared(
+            "threads_by_ids_v1", ("bigint[]",), threads_query, (list(thread_ids),)
+        )
         
-        # 格式化帖子数据
-        formatted_posts = []
-        for post in posts_result:
-            formatted_post = {
-                "id": post["id"],
-                "uuid": str(post["uuid"]),
-                "thread_uuid": str(post["thread_uuid"]),
-                "post_id": post["post_id"],
-                "author_name": post["author_name"],
-                "author_id": post["author_id"],
-                "author_profile_url": post["author_profile_url"],
-                "post_timestamp": post["post_timestamp"],
-                "content_text": post["content_text"],
-                "content_html": post["content_html"],
-                "image_urls": post["image_urls"] or [],
-                "external_links": post["external_links"] or [],
-                "iframe_urls": post["iframe_urls"] or [],
-                "floor": post["floor"],
-                "reactions": post["reactions"],
-                "create_time": post["create_time"].isoformat() if post["create_time"] else None,
-                "update_time": post["update_time"].isoformat() if post["update_time"] else None,
-                "is_deleted": post["is_deleted"]
-            }
-            formatted_posts.append(formatted_post)
-        
-        total_count = count_result["total_count"] if count_result else 0
+        logger.info(f"批量获取线程信息成功 - 请求 {len(thread_ids)} 个，返回 {len(threads_result)} 个")
+        return threads_result
         
-        logger.info(f"获取线程 ID {thread_id} 的帖子列表成功 - 返回 {len(formatted_posts)} 个帖子，总数: {total_count}")
+    except Exception as e:
+        logger.error(f"批量获取线程信息失败: {str(e)}")
+        raise e
+
+def get_posts_by_thread_ids(
+    thread_ids: List[int],
+    limit: int = 50,
+    offset: int = 0,
+    config_path: str = "config.yaml"
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    批量获取多个线程的帖子 - 通过窗口函数在一次查询中对每个线程分别分页
+    
+    Args:
+        thread_ids: 线程的数据库自增ID列表
+        limit: 每个线程返回的帖子数量限制
+        offset: 每个线程的偏移量
+        config_path: 配置文件路径
         
-        return {
-            "posts": formatted_posts,
-            "total_count": total_count
-        }
+    Returns:
+        线程ID到帖子列表的映射
+    """
+    try:
+        db_manager = _get_manager(config_path)
+        
+        # 按楼层为每个线程的帖子编号，只保留各线程 (offset, offset + limit] 区间的行，再查反应数据
+        posts_query = """
+            WITH ranked AS (
+                SELECT 
+                    tm.id as thread_id,
+                    tr.id,
+                    tr.uuid,
+                    tr.thread_uuid,
+                    tr.post_id,
+                    tr.author_name,
+                    tr.author_id,
+                    tr.author_profile_url,
+                    tr.post_timestamp,
+                    tr.content_text,
+                    tr.content_html,
+                    COALESCE(tr.image_urls, '[]') as image_urls,
+                    COALESCE(tr.external_links, '[]') as external_links,
+                    COALESCE(tr.iframe_urls, '[]') as iframe_urls,
+                    tr.floor,
+                    tr.create_time,
+                    tr.update_time,
+                    tr.is_deleted,
+                    ROW_NUMBER() OVER (PARTITION BY tr.thread_uuid ORDER BY tr.floor ASC) as rn
+                FROM simpcity_thread_metadata tm
+                JOIN simpcity_thread_response tr ON tr.thread_uuid = tm.uuid
+                WHERE tm.id = ANY($1)
+                    AND tm.is_deleted = false
+                    AND tr.is_deleted = false
+            ),
+            page AS (
+                SELECT * FROM ranked
+                WHERE rn > $3 AND rn <= $3 + $2
+            )
+            SELECT 
+                p.thread_id,
+                p.id,
+                p.uuid,
+                p.thread_uuid,
+                p.post_id,
+                p.author_name,
+                p.author_id,
+                p.author_profile_url,
+                p.post_timestamp,
+                p.content_text,
+                p.content_html,
+                p.image_urls,
+                p.external_links,
+                p.iframe_urls,
+                p.floor,
+                trc.reactions,
+                p.create_time,
+                p.update_time,
+                p.is_deleted
+            FROM page p
+            LEFT JOIN LATERAL (
+                SELECT reactions FROM simpcity_thread_reactions
+                WHERE post_uuid = p.uuid
+            ) trc ON true
+            ORDER BY p.thread_id, p.floor ASC
+        """
+        
+        posts_result = db_manager.execute_prepared(
+            "posts_by_thread_ids_v1",
+            ("bigint[]", "int", "int"),
+            posts_query,
+            (list(thread_ids), limit, offset)
+        )
+        
+        posts_by_thread: Dict[int, List[Dict[str, Any]]] = {}
+        for post in posts_result:
+            posts_by_thread.setdefault(post.pop("thread_id"), []).append(post)
+        
+        logger.info(f"批量获取帖子成功 - {len(posts_by_thread)} 个线程，共 {len(posts_result)} 个帖子")
+        return posts_by_thread
         
     except Exception as e:
-        logger.error(f"获取线程帖子列表失败: {str(e)}")
+        logger.error(f"批量获取帖子失败: {str(e)}")
         raise e
-    finally:
-        if 'db_manager' in locals():
-            db_manager.close_all_connections()
@@ -0,0 +1,58 @@
+from typing import Dict, Tuple
+import logging
+import mimetypes
+import os
+from pathlib import Path
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+logger = logging.getLogger(__name__)
+
+# Vite 构建产物的文件名带内容哈希，内容变化时文件名随之变化，可以长期缓存
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class InMemoryStaticFiles(StaticFiles):
+    """
+    将目录下的全部文件读入内存后提供服务的静态文件应用
+
+    适用于构建后不再变化的前端资源，请求时不访问文件系统；
+    未命中内存缓存的路径交给 StaticFiles 原有逻辑处理（通常返回404）
+    """
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self._files: Dict[str, Tuple[bytes, str]] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        """重新读取目录下的全部文件，前端重新构建后调用"""
+        root = Path(self.directory)
+        files = {}
+        for file_path in root.rglob("*"):
+            if not file_path.is_file():
+                continue
+            media_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+            # 键与 StaticFiles.get_path 的规范化结果保持一致
+            key = os.path.normpath(str(file_path.relative_to(root)))
+            files[key] = (file_path.read_bytes(), media_type)
+        self._files = files
+        logger.info(f"已将 {len(files)} 个静态资源加载到内存: {self.directory}")
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        cached = self._files.get(path)
+        if cached is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        content, media_type = cached
+        if scope["method"] == "HEAD":
+            return Response(
+                media_type=media_type,
+                headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Content-Length": str(len(content))}
+            )
+        return Response(
+            content=content,
+            media_type=media_type,
+            headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        )
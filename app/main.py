@@ -12,73 +12,154 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException, status
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, status, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.responses import FileResponse
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field, HttpUrl
 from typing import Optional, Dict, Any, List
 import logging
 import asyncio
 from datetime import datetime
 import uuid
+import time
+import itertools
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 import os
+import signal
+import hashlib
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 from crawler.simpcity.simpcity import crawler, sync, watch
 from config.config import get_config
 from cookies.cookies import BrowserCookies
-from app.router.threads import router as threads_router
+from app.router.threads import router as threads_router, shutdown_download_executor
+from app.internal.simpcity.simpcity import close_managers
+from app.internal.cache import bump_generation
+from app.internal.static import InMemoryStaticFiles
 
 # 配置统一日志
+# 请求处理中只把日志记录放入队列，由后台线程添加时间等前缀并写入stderr，避免慢速终端或管道阻塞事件循环
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_queue = queue.SimpleQueue()
+log_listener = QueueListener(_log_queue, _log_handler, respect_handler_level=True)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(message)s',
     handlers=[
-        logging.StreamHandler()
+        QueueHandler(_log_queue)
     ]
 )
+log_listener.start()
 logger = logging.getLogger(__name__)
 
+# 请求ID仅用于日志关联，使用 进程号-自增计数 即可在进程内保持唯一
+_REQ_COUNTER = itertools.count()
+_PID_TAG = f"{os.getpid():x}"
+
+def new_request_id() -> str:
+    """生成用于日志关联的请求ID"""
+    return f"{_PID_TAG}-{next(_REQ_COUNTER):x}"
+
+# 爬取/同步等阻塞任务使用的线程数，与FastAPI处理同步路由的线程池相互独立
+JOB_EXECUTOR_WORKERS = int(os.getenv("JOB_EXECUTOR_WORKERS", "8"))
+# 爬取队列的消费者数量和队列容量，队列满时新的爬取请求返回503
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "2"))
+CRAWL_QUEUE_SIZE = int(os.getenv("CRAWL_QUEUE_SIZE", "256"))
+
+async def crawl_worker(queue: asyncio.Queue):
+    """从爬取队列中依次取出任务并在线程池中执行"""
+    while True:
+        request_id, job = await queue.get()
+        try:
+            result = await asyncio.to_thread(crawler, **job)
+            logger.info(f"[{request_id}] 爬取完成: {result}")
+            bump_generation()
+        except Exception as e:
+            logger.error(f"[{request_id}] 爬取失败: {str(e)}")
+        finally:
+            queue.task_done()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时为阻塞任务安装专用线程池并启动爬取队列消费者，关闭时释放相关资源和共享的数据库连接池"""
+    executor = ThreadPoolExecutor(max_workers=JOB_EXECUTOR_WORKERS, thread_name_prefix="dionysus-job")
+    asyncio.get_running_loop().set_default_executor(executor)
+    
+    warm_up_models()
+    
+    app.state.crawl_queue = asyncio.Queue(maxsize=CRAWL_QUEUE_SIZE)
+    workers = [asyncio.create_task(crawl_worker(app.state.crawl_queue)) for _ in range(CRAWL_WORKERS)]
+    
+    # 前端重新构建后发送 SIGHUP 即可重新加载前端文件，无需重启服务
+    if getattr(app.state, "index_html", None) is not None:
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_frontend)
+        except (AttributeError, NotImplementedError):
+            # Windows 不支持 SIGHUP
+            pass
+    
+    yield
+    
+    # 未开始的爬取任务随进程退出丢弃，正在执行的任务由线程池关闭时取消等待
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    executor.shutdown(wait=False, cancel_futures=True)
+    shutdown_download_executor()
+    close_managers()
+    # 写出队列中剩余的日志
+    log_listener.stop()
+
 app = FastAPI(
     title="SimpCity API",
     description="SimpCity论坛爬虫API接口",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# 线程和帖子列表的JSON体积较大且重复度高，超过1KB的响应按客户端的Accept-Encoding进行gzip压缩
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # 注册路由
 app.include_router(threads_router)
 
-# 配置静态文件服务
-dist_path = Path("dist")
-if dist_path.exists():
-    # 挂载静态文件
-    app.mount("/assets", StaticFiles(directory="dist/assets"), name="assets")
-    
-    # 提供前端页面
-    @app.get("/")
-    async def serve_frontend():
-        """提供前端页面"""
-        return FileResponse("dist/index.html")
-    
-    # 处理前端路由（SPA 路由）
-    @app.get("/{path:path}")
-    async def serve_spa(path: str):
-        """处理前端 SPA 路由"""
-        # 如果是 API 路由，跳过
-        if path.startswith("api/"):
-            raise HTTPException(status_code=404, detail="Not found")
-        
-        # 检查是否是静态文件
-        static_file_path = dist_path / path
-        if static_file_path.exists() and static_file_path.is_file():
-            return FileResponse(static_file_path)
-        
-        # 否则返回 index.html（SPA 路由）
-        return FileResponse("dist/index.html")
-
 # 全局监控器存储
 active_watchers: Dict[str, Dict[str, Any]] = {}
+# 保护监控器的创建与删除，避免并发停止同一监控器
+_watchers_lock = asyncio.Lock()
+# 刷新监控器状态时的最大并发数和单个监控器的超时时间（秒）
+STATUS_REFRESH_CONCURRENCY = 16
+STATUS_REFRESH_TIMEOUT = 1.0
+
+async def refresh_watcher_statuses(watchers: List[Dict[str, Any]]) -> None:
+    """
+    并发查询监控器的实时状态并更新状态快照
+    
+    单个监控器查询失败或超时时保留原有快照，不影响其他监控器
+    
+    Args:
+        watchers: 监控器存储数据列表
+    """
+    semaphore = asyncio.Semaphore(STATUS_REFRESH_CONCURRENCY)
+    
+    async def refresh_one(watcher_data: Dict[str, Any]):
+        async with semaphore:
+            status_info = await asyncio.wait_for(
+                asyncio.to_thread(watcher_data['watcher']['status']),
+                timeout=STATUS_REFRESH_TIMEOUT
+            )
+        watcher_data['last_status'] = status_info
+    
+    results = await asyncio.gather(*(refresh_one(w) for w in watchers), return_exceptions=True)
+    for watcher_data, result in zip(watchers, results):
+        if isinstance(result, Exception):
+            logger.warning(f"刷新监控器状态失败，使用上次的状态: {watcher_data['request_id']} {result!r}")
 
 # Pydantic模型定义
 class CrawlerRequest(BaseModel):
@@ -110,12 +191,42 @@ class ApiResponse(BaseModel):
     message: str
     data: Optional[Dict[str, Any]] = None
     request_id: Optional[str] = None
-    timestamp: datetime = Field(default_factory=datetime.now)
+    # Unix时间戳（秒），避免每次响应都格式化datetime
+    timestamp: int = Field(default_factory=lambda: int(time.time()))
+
+def warm_up_models() -> None:
+    """
+    启动时对请求/响应模型各执行一次校验和序列化
+    
+    使 HttpUrl 等校验路径的首次开销发生在启动阶段，而不是第一个真实请求上
+    """
+    sample_url = "https://simpcity.su/threads/example.1/"
+    for model in (CrawlerRequest, SyncRequest, WatchRequest):
+        model.model_validate({"thread_url": sample_url}).model_dump(mode="json")
+    ApiResponse(success=True, message="warm-up", data={}).model_dump_json()
+
+# cookies缓存：配置文件路径 -> (配置文件mtime, 浏览器cookies文件mtime, 过期时间, cookies)
+_cookie_cache: Dict[str, tuple] = {}
+
+def _file_mtime(path: str) -> Optional[float]:
+    """获取文件修改时间，文件不存在时返回None"""
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
 
 # 辅助函数
 def load_cookies_from_config(config_path: str = "config.yaml") -> Dict[str, str]:
     """从配置文件或浏览器cookies文件加载cookies"""
     try:
+        # 配置文件和浏览器cookies文件都未修改、且没有cookie到期时直接复用上次结果
+        config_mtime = os.stat(config_path).st_mtime
+        browser_mtime = _file_mtime("browser_cookies.json")
+        cached = _cookie_cache.get(config_path)
+        if (cached and cached[0] == config_mtime and cached[1] == browser_mtime
+                and (cached[2] is None or time.time() < cached[2])):
+            return cached[3]
+        
         # 首先尝试从配置文件读取
         config = get_config(config_path)
         browser_cookies = config.get("cookies")
@@ -159,6 +270,15 @@ def load_cookies_from_config(config_path: str = "config.yaml") -> Dict[str, str]
             
             raise ValueError(error_msg)
         
+        # 最早到期的cookie过期后缓存失效，保证过期cookie会被重新过滤
+        expirations = [
+            cookie.expirationDate for cookie in cookies_manager._cookies
+            if not cookie.session and cookie.expirationDate is not None and not cookie.is_expired()
+        ]
+        _cookie_cache[config_path] = (
+            config_mtime, browser_mtime, min(expirations) if expirations else None, requests_cookies
+        )
+        
         logger.info(f"成功加载 {len(requests_cookies)} 个cookies（域名: {target_domain or '所有域名'}）")
         return requests_cookies
         
@@ -197,13 +317,13 @@ async def api_root():
     )
 
 @app.post("/api/crawler", response_model=ApiResponse)
-async def crawl_thread(request: CrawlerRequest, background_tasks: BackgroundTasks):
+async def crawl_thread(request: CrawlerRequest):
     """
     爬取帖子
     
     完整爬取指定帖子的所有页面和帖子数据
     """
-    request_id = str(uuid.uuid4())
+    request_id = new_request_id()
     
     try:
         logger.info(f"[{request_id}] 开始爬取帖子: {request.thread_url}")
@@ -211,35 +331,31 @@ async def crawl_thread(request: CrawlerRequest, background_tasks: BackgroundTask
         # 加载cookies
         cookies = load_cookies_from_config(request.config_path)
         
-        # 执行爬取（在后台任务中执行以避免阻塞）
-        def run_crawler():
-            try:
-                result = crawler(
-                    thread_url=str(request.thread_url),
-                    cookies=cookies,
-                    thread_title=request.thread_title,
-                    enable_reactions=request.enable_reactions,
-                    save_to_db=request.save_to_db,
-                    config_path=request.config_path
-                )
-                logger.info(f"[{request_id}] 爬取完成: {result}")
-            except Exception as e:
-                logger.error(f"[{request_id}] 爬取失败: {str(e)}")
-        
-        background_tasks.add_task(run_crawler)
+        # 放入爬取队列，由后台消费者在线程池中执行
+        job = request.model_dump(mode="json")
+        job["cookies"] = cookies
+        try:
+            app.state.crawl_queue.put_nowait((request_id, job))
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="爬取队列已满，请稍后重试"
+            )
         
         return ApiResponse(
             success=True,
-            message="爬取任务已启动，正在后台执行",
+            message="爬取任务已加入队列，正在后台执行",
             data={
-                "thread_url": str(request.thread_url),
-                "thread_title": request.thread_title,
-                "enable_reactions": request.enable_reactions,
-                "save_to_db": request.save_to_db
+                "thread_url": job["thread_url"],
+                "thread_title": job["thread_title"],
+                "enable_reactions": job["enable_reactions"],
+                "save_to_db": job["save_to_db"]
             },
             request_id=request_id
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[{request_id}] 爬取任务启动失败: {str(e)}")
         raise HTTPException(
@@ -254,7 +370,7 @@ async def sync_thread(request: SyncRequest):
     
     对比现有数据和最新数据，进行增量同步
     """
-    request_id = str(uuid.uuid4())
+    request_id = new_request_id()
     
     try:
         logger.info(f"[{request_id}] 开始同步帖子: {request.thread_url}")
@@ -262,17 +378,15 @@ async def sync_thread(request: SyncRequest):
         # 加载cookies
         cookies = load_cookies_from_config(request.config_path)
         
-        # 执行同步
-        result = sync(
-            thread_url=str(request.thread_url),
+        # 执行同步（在线程池中执行以避免阻塞事件循环）
+        result = await asyncio.to_thread(
+            sync,
             cookies=cookies,
-            thread_title=request.thread_title,
-            enable_reactions=request.enable_reactions,
-            save_to_db=request.save_to_db,
-            config_path=request.config_path
+            **request.model_dump(mode="json")
         )
         
         logger.info(f"[{request_id}] 同步完成: {result}")
+        bump_generation()
         
         if result['success']:
             return ApiResponse(
@@ -303,7 +417,7 @@ async def start_watch(request: WatchRequest):
     
     创建定时任务监控指定帖子的更新
     """
-    request_id = str(uuid.uuid4())
+    request_id = new_request_id()
     watcher_id = str(uuid.uuid4())
     
     try:
@@ -312,32 +426,39 @@ async def start_watch(request: WatchRequest):
         # 加载cookies
         cookies = load_cookies_from_config(request.config_path)
         
+        # 请求参数只转换一次，保存的快照和传给监控器的参数共用这份纯字典
+        req_snapshot = request.model_dump(mode="json")
+        
+        # 监控器每次同步后推送状态快照，列表接口直接读取快照而无需逐个查询监控器
+        watcher_data = {
+            'request': req_snapshot,
+            'created_at': datetime.now(),
+            'request_id': request_id,
+            'last_status': None
+        }
+        
+        def on_sync(status_info: Dict[str, Any]):
+            watcher_data['last_status'] = status_info
+            bump_generation()
+        
         # 创建监控器
         watcher = watch(
-            thread_url=str(request.thread_url),
             cookies=cookies,
-            schedule_type=request.schedule_type,
-            interval_minutes=request.interval_minutes,
-            cron_expression=request.cron_expression,
-            thread_title=request.thread_title,
-            enable_reactions=request.enable_reactions,
-            save_to_db=request.save_to_db,
-            config_path=request.config_path
+            on_sync=on_sync,
+            **req_snapshot
         )
+        watcher_data['watcher'] = watcher
         
         # 启动监控
-        watcher['start']()
+        await asyncio.to_thread(watcher['start'])
         
-        # 保存到全局存储
-        active_watchers[watcher_id] = {
-            'watcher': watcher,
-            'request': request.dict(),
-            'created_at': datetime.now(),
-            'request_id': request_id
-        }
+        # 获取状态（读取调度器状态，同样放到线程中执行）
+        status_info = await asyncio.to_thread(watcher['status'])
+        watcher_data['last_status'] = status_info
         
-        # 获取状态
-        status_info = watcher['status']()
+        # 保存到全局存储
+        async with _watchers_lock:
+            active_watchers[watcher_id] = watcher_data
         
         logger.info(f"[{request_id}] 监控器已启动: {watcher_id}")
         
@@ -360,16 +481,20 @@ async def start_watch(request: WatchRequest):
         )
 
 @app.get("/api/watchers", response_model=ApiResponse)
-async def list_watchers():
+async def list_watchers(refresh: bool = False):
     """
     获取所有监控器列表
+    
+    默认返回各监控器最近一次同步后的状态快照，refresh=true 时并发查询实时状态
     """
     try:
         watchers_info = []
         
-        for watcher_id, watcher_data in active_watchers.items():
-            watcher = watcher_data['watcher']
-            status_info = watcher['status']()
+        if refresh:
+            await refresh_watcher_statuses(list(active_watchers.values()))
+        
+        for watcher_id, watcher_data in list(active_watchers.items()):
+            status_info = watcher_data['last_status']
             
             watchers_info.append({
                 "watcher_id": watcher_id,
@@ -400,9 +525,11 @@ async def list_watchers():
         )
 
 @app.get("/api/watchers/{watcher_id}", response_model=ApiResponse)
-async def get_watcher(watcher_id: str):
+async def get_watcher(watcher_id: str, refresh: bool = False):
     """
     获取指定监控器的详细状态
+    
+    默认返回监控器最近一次同步后的状态快照，refresh为True时实时查询
     """
     try:
         if watcher_id not in active_watchers:
@@ -412,8 +539,9 @@ async def get_watcher(watcher_id: str):
             )
         
         watcher_data = active_watchers[watcher_id]
-        watcher = watcher_data['watcher']
-        status_info = watcher['status']()
+        if refresh:
+            await refresh_watcher_statuses([watcher_data])
+        status_info = watcher_data['last_status']
         
         return ApiResponse(
             success=True,
@@ -441,20 +569,21 @@ async def stop_watcher(watcher_id: str):
     停止并删除指定监控器
     """
     try:
-        if watcher_id not in active_watchers:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"监控器 {watcher_id} 不存在"
-            )
-        
-        watcher_data = active_watchers[watcher_id]
-        watcher = watcher_data['watcher']
-        
-        # 停止监控
-        watcher['stop']()
-        
-        # 从存储中删除
-        del active_watchers[watcher_id]
+        async with _watchers_lock:
+            if watcher_id not in active_watchers:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"监控器 {watcher_id} 不存在"
+                )
+            
+            watcher_data = active_watchers[watcher_id]
+            watcher = watcher_data['watcher']
+            
+            # 停止监控
+            await asyncio.to_thread(watcher['stop'])
+            
+            # 从存储中删除
+            del active_watchers[watcher_id]
         
         logger.info(f"监控器 {watcher_id} 已停止并删除")
         
@@ -489,12 +618,12 @@ async def force_sync_watcher(watcher_id: str):
         watcher = watcher_data['watcher']
         
         # 手动触发同步
-        watcher['force_sync']()
+        await asyncio.to_thread(watcher['force_sync'])
         
         logger.info(f"监控器 {watcher_id} 手动同步已触发")
         
         # 获取最新状态
-        status_info = watcher['status']()
+        status_info = await asyncio.to_thread(watcher['status'])
         
         return ApiResponse(
             success=True,
@@ -512,4 +641,64 @@ async def force_sync_watcher(watcher_id: str):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"手动触发同步失败: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+# 配置静态文件服务
+# 生产环境由 nginx 直接提供前端文件（见 deploy/nginx.conf.example），设置 SERVE_STATIC=0 关闭
+dist_path = Path("dist")
+if os.getenv("SERVE_STATIC", "1") != "0" and dist_path.exists():
+    # 挂载静态文件，构建产物不可变，启动时全部读入内存
+    assets_app = InMemoryStaticFiles(directory="dist/assets")
+    app.mount("/assets", assets_app, name="assets")
+    
+    dist_files: set = set()
+    
+    def load_frontend_files() -> None:
+        """
+        读取前端构建产物
+        
+        记录 dist 下的全部文件，SPA回退时只做集合查找而不逐次访问文件系统；
+        index.html 体积很小，直接缓存其内容和ETag，避免每次请求都打开文件
+        """
+        global dist_files
+        dist_files = {p.relative_to(dist_path).as_posix() for p in dist_path.rglob("*") if p.is_file()}
+        app.state.index_html = (dist_path / "index.html").read_bytes()
+        app.state.index_etag = '"' + hashlib.blake2b(app.state.index_html, digest_size=8).hexdigest() + '"'
+        logger.info(f"已加载前端文件，共 {len(dist_files)} 个")
+    
+    load_frontend_files()
+    
+    def reload_frontend() -> None:
+        """重新加载静态资源和前端页面"""
+        assets_app.reload()
+        load_frontend_files()
+    
+    def index_response(request: Request) -> Response:
+        """返回缓存的 index.html，客户端ETag匹配时返回304"""
+        etag = app.state.index_etag
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=app.state.index_html, media_type="text/html", headers=headers)
+    
+    # 提供前端页面
+    @app.get("/")
+    async def serve_frontend(request: Request):
+        """提供前端页面"""
+        return index_response(request)
+    
+    # 处理前端路由（SPA 路由）
+    @app.get("/{path:path}")
+    async def serve_spa(path: str, request: Request):
+        """处理前端 SPA 路由"""
+        # 未匹配的 API 路径返回404，不回退到前端页面；
+        # 回退路由只处理GET，方法不匹配的 API 请求仍由路由返回405
+        if path.startswith("api/"):
+            raise HTTPException(status_code=404, detail="Not found")
+        
+        # 检查是否是静态文件
+        if path in dist_files and path != "index.html":
+            return FileResponse(os.path.join("dist", path))
+        
+        # 否则返回 index.html（SPA 路由）
+        return index_response(request)
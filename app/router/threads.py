@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, BackgroundTasks, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 from datetime import datetime
-import re
-import json
+from uuid import UUID
+import hashlib
+import orjson
 
-from app.internal.simpcity.simpcity import get_threads_list, get_thread_info, get_thread_posts, get_thread_info_by_id, get_thread_posts_by_id
+from app.internal.simpcity.simpcity import get_threads_list, get_thread_info, get_thread_posts, get_thread_info_by_id, get_thread_posts_by_id, get_thread_posts_summary, get_post_by_uuid, get_bunkr_links_for_post, get_threads_by_ids, get_posts_by_thread_ids
 from crawler.download.bunkr import download_from_bunkr
 
 logger = logging.getLogger(__name__)
@@ -23,8 +30,8 @@ class ThreadInfo(BaseModel):
     tags: Optional[List[str]] = None
     avatar_img: Optional[str] = None
     description: Optional[str] = None
-    create_time: Optional[str] = None
-    update_time: Optional[str] = None
+    create_time: Optional[datetime] = None
+    update_time: Optional[datetime] = None
     posts_count: int
     latest_post_timestamp: Optional[str] = None
     first_post_timestamp: Optional[str] = None
@@ -36,6 +43,15 @@ class ThreadsListResponse(BaseModel):
     message: str
     data: List[ThreadInfo]
     total_count: int
+    next_cursor: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    """批量获取线程请求模型"""
+    ids: List[int]
+    with_posts: bool = False
+    limit: int = 50
+    offset: int = 0
+    config_path: str = "config.yaml"
 
 class DownloadRequest(BaseModel):
     """下载请求模型"""
@@ -55,10 +71,68 @@ class DownloadResponse(BaseModel):
     download_results: List[Dict[str, Any]]
     errors: List[str]
 
+# 分页参数上限：limit 超出时截断，offset 过大时要求改用游标分页（线程列表为 cursor，帖子为 after_floor）
+MAX_LIMIT = 200
+MAX_OFFSET = 10000
+# 批量接口单次最多查询的线程数
+MAX_BATCH_IDS = 100
+# 可缓存接口的客户端缓存时间（秒），与查询结果缓存的有效期一致
+CACHE_MAX_AGE = 30
+
+# bunkr下载专用进程池，下载中的解析、哈希等计算不与API进程争用GIL；
+# 使用 spawn 启动子进程，避免 fork 已持有数据库连接和线程的API进程
+DOWNLOAD_CONCURRENCY = 4
+_download_executor = ProcessPoolExecutor(
+    max_workers=DOWNLOAD_CONCURRENCY,
+    mp_context=multiprocessing.get_context("spawn")
+)
+
+def shutdown_download_executor() -> None:
+    """关闭下载进程池（应用关闭时调用），未开始的下载任务直接取消"""
+    _download_executor.shutdown(wait=False, cancel_futures=True)
+
+def _conditional_response(request: Request, payload: Any) -> Tuple[Optional[Response], Dict[str, str]]:
+    """
+    为可缓存的GET响应计算ETag和Cache-Control
+    
+    Args:
+        request: 当前请求
+        payload: 将要返回的数据，ETag由其序列化结果计算
+        
+    Returns:
+        (客户端缓存仍然有效时的304响应，否则为None, 需附加到响应上的缓存头)
+    """
+    etag = '"' + hashlib.blake2b(orjson.dumps(payload), digest_size=8).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={CACHE_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers), headers
+    return None, headers
+
+def _check_pagination(limit: int, offset: int) -> int:
+    """
+    校验分页参数
+    
+    Args:
+        limit: 请求的数量限制
+        offset: 请求的偏移量
+        
+    Returns:
+        截断到 [1, MAX_LIMIT] 区间内的limit
+    """
+    if offset < 0 or offset > MAX_OFFSET:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"offset 需在 0 到 {MAX_OFFSET} 之间，更深的翻页请使用游标分页"
+        )
+    return min(max(limit, 1), MAX_LIMIT)
+
 @router.get("/list", response_model=ThreadsListResponse)
 async def list_threads(
+    request: Request,
+    response: Response,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     config_path: str = "config.yaml"
 ):
     """
@@ -68,29 +142,45 @@ async def list_threads(
     
     Args:
         limit: 返回的线程数量限制，默认50
-        offset: 偏移量，默认0
+        offset: 偏移量，默认0（提供cursor时忽略）
+        cursor: 翻页游标，取上一页返回的next_cursor
         config_path: 配置文件路径
         
     Returns:
         线程列表响应
     """
+    limit = _check_pagination(limit, offset)
+    
     try:
-        logger.info(f"获取线程列表 - limit: {limit}, offset: {offset}")
+        logger.info(f"获取线程列表 - limit: {limit}, offset: {offset}, cursor: {cursor}")
         
         # 调用内部服务获取线程列表
-        threads_data = get_threads_list(
+        threads_data = await run_in_threadpool(
+            get_threads_list,
             limit=limit,
             offset=offset,
-            config_path=config_path
+            config_path=config_path,
+            cursor=cursor
         )
         
+        not_modified, cache_headers = _conditional_response(request, threads_data)
+        if not_modified is not None:
+            return not_modified
+        response.headers.update(cache_headers)
+        
         return ThreadsListResponse(
             success=True,
             message="获取线程列表成功",
             data=threads_data["threads"],
-            total_count=threads_data["total_count"]
+            total_count=threads_data["total_count"],
+            next_cursor=threads_data["next_cursor"]
         )
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"获取线程列表失败: {str(e)}")
         raise HTTPException(
@@ -98,8 +188,64 @@ async def list_threads(
             detail=f"获取线程列表失败: {str(e)}"
         )
 
+@router.post("/batch", response_model=Dict[str, Any])
+async def get_threads_batch(request: BatchRequest):
+    """
+    批量获取多个线程的信息（可选附带每个线程的帖子）
+    
+    线程信息和帖子各只需一次数据库查询，替代逐个调用 /id/{thread_id} 和 /id/{thread_id}/posts
+    
+    Args:
+        request: 批量请求，包含线程ID列表、是否附带帖子及每个线程的分页参数
+        
+    Returns:
+        以线程ID为键的线程信息映射，不存在的线程不会出现在结果中
+    """
+    if len(request.ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多查询 {MAX_BATCH_IDS} 个线程"
+        )
+    limit = _check_pagination(request.limit, request.offset)
+    thread_ids = list(dict.fromkeys(request.ids))
+    
+    try:
+        logger.info(f"批量获取线程 - 数量: {len(thread_ids)}, with_posts: {request.with_posts}")
+        
+        if request.with_posts:
+            threads, posts_by_thread = await asyncio.gather(
+                run_in_threadpool(get_threads_by_ids, thread_ids, request.config_path),
+                run_in_threadpool(
+                    get_posts_by_thread_ids, thread_ids, limit, request.offset, request.config_path
+                )
+            )
+        else:
+            threads = await run_in_threadpool(get_threads_by_ids, thread_ids, request.config_path)
+            posts_by_thread = None
+        
+        data = {}
+        for thread in threads:
+            item = dict(thread)
+            if posts_by_thread is not None:
+                item["posts"] = posts_by_thread.get(thread["id"], [])
+            data[thread["id"]] = item
+        
+        return ORJSONResponse({
+            "success": True,
+            "message": f"批量获取线程成功，共 {len(data)} 个",
+            "data": data
+        })
+        
+    except Exception as e:
+        logger.error(f"批量获取线程失败: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"批量获取线程失败: {str(e)}"
+        )
+
 @router.get("/id/{thread_id}", response_model=Dict[str, Any])
 async def get_thread_by_id(
+    request: Request,
     thread_id: int,
     config_path: str = "config.yaml"
 ):
@@ -117,18 +263,22 @@ async def get_thread_by_id(
         logger.info(f"获取线程信息 - ID: {thread_id}")
         
         # 获取线程基本信息
-        thread_info = get_thread_info_by_id(thread_id, config_path)
+        thread_info = await run_in_threadpool(get_thread_info_by_id, thread_id, config_path)
         if not thread_info:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"未找到线程 ID: {thread_id}"
             )
         
-        return {
+        not_modified, cache_headers = _conditional_response(request, thread_info)
+        if not_modified is not None:
+            return not_modified
+        
+        return ORJSONResponse({
             "success": True,
             "message": "获取线程信息成功",
             "data": thread_info
-        }
+        }, headers=cache_headers)
         
     except HTTPException:
         raise
@@ -144,6 +294,9 @@ async def get_thread_posts_by_id_endpoint(
     thread_id: int,
     limit: int = 50,
     offset: int = 0,
+    after_floor: Optional[int] = None,
+    include_html: bool = True,
+    view: str = "full",
     config_path: str = "config.yaml"
 ):
     """
@@ -152,17 +305,37 @@ async def get_thread_posts_by_id_endpoint(
     Args:
         thread_id: 线程的数据库自增ID
         limit: 返回的帖子数量限制，默认50
-        offset: 偏移量，默认0
+        offset: 偏移量，默认0（提供after_floor时忽略）
+        after_floor: 翻页游标，取上一页返回的next_cursor
+        include_html: 是否返回帖子的content_html，默认True
+        view: 返回视图，full为完整帖子，list为摘要（完整内容通过 /post/{post_uuid} 获取）
         config_path: 配置文件路径
         
     Returns:
         帖子列表响应
     """
+    limit = _check_pagination(limit, offset)
+    
     try:
-        logger.info(f"获取线程帖子 - ID: {thread_id}, limit: {limit}, offset: {offset}")
+        logger.info(f"获取线程帖子 - ID: {thread_id}, limit: {limit}, offset: {offset}, after_floor: {after_floor}")
+        
+        if view not in ("full", "list"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"不支持的view: {view}，可选值为 full 或 list"
+            )
         
         # 获取线程帖子列表
-        posts_data = get_thread_posts_by_id(thread_id, limit, offset, config_path)
+        if view == "list":
+            posts_data = await run_in_threadpool(
+                get_thread_posts_summary, thread_id, limit, offset, config_path,
+                after_floor=after_floor
+            )
+        else:
+            posts_data = await run_in_threadpool(
+                get_thread_posts_by_id, thread_id, limit, offset, config_path,
+                after_floor=after_floor, include_html=include_html
+            )
         
         if posts_data is None:
             raise HTTPException(
@@ -170,12 +343,13 @@ async def get_thread_posts_by_id_endpoint(
                 detail=f"未找到线程 ID: {thread_id}"
             )
         
-        return {
+        return ORJSONResponse({
             "success": True,
             "message": "获取线程帖子成功",
             "data": posts_data["posts"],
-            "total_count": posts_data["total_count"]
-        }
+            "total_count": posts_data["total_count"],
+            "next_cursor": posts_data["next_cursor"]
+        })
         
     except HTTPException:
         raise
@@ -186,11 +360,53 @@ async def get_thread_posts_by_id_endpoint(
             detail=f"获取线程帖子失败: {str(e)}"
         )
 
+@router.get("/post/{post_uuid}", response_model=Dict[str, Any])
+async def get_post_detail(
+    post_uuid: UUID,
+    config_path: str = "config.yaml"
+):
+    """
+    根据帖子UUID获取单个帖子的完整内容
+    
+    Args:
+        post_uuid: 帖子UUID
+        config_path: 配置文件路径
+        
+    Returns:
+        帖子完整内容
+    """
+    try:
+        logger.info(f"获取帖子详情 - UUID: {post_uuid}")
+        
+        post = await run_in_threadpool(get_post_by_uuid, str(post_uuid), config_path)
+        if not post:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"未找到帖子: {post_uuid}"
+            )
+        
+        return ORJSONResponse({
+            "success": True,
+            "message": "获取帖子成功",
+            "data": post
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取帖子详情失败: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"获取帖子详情失败: {str(e)}"
+        )
+
 @router.get("/{thread_url:path}", response_model=Dict[str, Any])
 async def get_thread_detail(
     thread_url: str,
     limit: int = 50,
     offset: int = 0,
+    after_floor: Optional[int] = None,
+    include_html: bool = True,
     config_path: str = "config.yaml"
 ):
     """
@@ -199,33 +415,41 @@ async def get_thread_detail(
     Args:
         thread_url: 线程URL
         limit: 返回的帖子数量限制，默认50
-        offset: 偏移量，默认0
+        offset: 偏移量，默认0（提供after_floor时忽略）
+        after_floor: 翻页游标，取上一页返回的next_cursor
+        include_html: 是否返回帖子的content_html，默认True
         config_path: 配置文件路径
         
     Returns:
         线程详细信息和帖子列表
     """
+    limit = _check_pagination(limit, offset)
+    
     try:
         logger.info(f"获取线程详细信息 - URL: {thread_url}")
         
-        # 获取线程基本信息
-        thread_info = get_thread_info(thread_url, config_path)
+        # 并发获取线程基本信息和帖子列表
+        thread_info, posts_data = await asyncio.gather(
+            run_in_threadpool(get_thread_info, thread_url, config_path),
+            run_in_threadpool(
+                get_thread_posts, thread_url, limit, offset, config_path,
+                after_floor=after_floor, include_html=include_html
+            )
+        )
         if not thread_info:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"未找到线程: {thread_url}"
             )
         
-        # 获取线程帖子列表
-        posts_data = get_thread_posts(thread_url, limit, offset, config_path)
-        
-        return {
+        return ORJSONResponse({
             "success": True,
             "message": "获取线程详细信息成功",
             "thread_info": thread_info,
             "posts": posts_data["posts"],
-            "total_posts": posts_data["total_count"]
-        }
+            "total_posts": posts_data["total_count"],
+            "next_cursor": posts_data["next_cursor"]
+        })
         
     except HTTPException:
         raise
@@ -236,92 +460,64 @@ async def get_thread_detail(
             detail=f"获取线程详细信息失败: {str(e)}"
         )
 
-def get_post_by_id(post_id: str, thread_url: str, config_path: str = "config.yaml") -> Optional[Dict[str, Any]]:
+async def download_bunkr_links(
+    bunkr_links: List[str],
+    request: DownloadRequest
+) -> Tuple[List[Dict[str, Any]], List[str]]:
     """
-    根据post_id和thread_url获取特定帖子的详细信息
+    并发下载多个bunkr链接
     
-    Args:
-        post_id: 帖子ID
-        thread_url: 线程URL  
-        config_path: 配置文件路径
+    每个链接在下载专用进程池中执行，同时进行的下载数不超过 DOWNLOAD_CONCURRENCY
     
-    Returns:
-        帖子信息字典或None
-    """
-    try:
-        from db.postgre import PostgreSQLManager
-        
-        db_manager = PostgreSQLManager(config_path)
-        
-        # 查询特定帖子 - 使用新的表结构
-        query = """
-        SELECT r.id, r.uuid, r.thread_uuid, r.post_id, r.author_name, 
-               r.author_id, r.author_profile_url, r.post_timestamp,
-               r.content_text, r.content_html, r.image_urls, 
-               r.external_links, r.iframe_urls, r.floor,
-               r.create_time, r.update_time, r.is_deleted,
-               t.url as thread_url,
-               t.name as thread_name,
-               react.reactions
-        FROM simpcity_thread_response r
-        JOIN simpcity_thread_metadata t ON r.thread_uuid = t.uuid
-        LEFT JOIN simpcity_thread_reactions react ON r.uuid = react.post_uuid
-        WHERE r.post_id = %s AND t.url = %s AND r.is_deleted = FALSE
-        """
-        
-        result = db_manager.execute_one(query, (post_id, thread_url))
-        
-        if result:
-            return {
-                "id": result["id"],
-                "uuid": str(result["uuid"]),
-                "thread_uuid": str(result["thread_uuid"]),
-                "post_id": result["post_id"],
-                "author_name": result["author_name"],
-                "author_id": result["author_id"],
-                "author_profile_url": result["author_profile_url"],
-                "post_timestamp": result["post_timestamp"],
-                "content_text": result["content_text"],
-                "content_html": result["content_html"],
-                "image_urls": result["image_urls"] or [],
-                "external_links": result["external_links"] or [],
-                "iframe_urls": result["iframe_urls"] or [],
-                "floor": result["floor"],
-                "reactions": result["reactions"],
-                "create_time": result["create_time"].isoformat() if result["create_time"] else None,
-                "update_time": result["update_time"].isoformat() if result["update_time"] else None,
-                "is_deleted": result["is_deleted"],
-                "thread_url": result["thread_url"],
-                "thread_name": result["thread_name"]
-            }
-        
-        return None
+    Args:
+        bunkr_links: bunkr链接列表
+        request: 下载请求参数
         
-    except Exception as e:
-        logger.error(f"获取帖子 {post_id} 失败: {str(e)}")
-        return None
-    finally:
-        if 'db_manager' in locals():
-            db_manager.close_all_connections()
-
-def extract_bunkr_links(external_links: List[str]) -> List[str]:
+    Returns:
+        (按链接顺序排列的下载结果列表, 错误信息列表)
     """
-    从外部链接列表中提取bunkr相关链接
+    semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    loop = asyncio.get_running_loop()
     
-    Args:
-        external_links: 外部链接列表
+    async def download_one(index: int, link: str):
+        async with semaphore:
+            logger.info(f"正在下载第 {index+1}/{len(bunkr_links)} 个链接: {link}")
+            return await loop.run_in_executor(
+                _download_executor,
+                functools.partial(
+                    download_from_bunkr,
+                    url=link,
+                    download_dir=request.download_dir,
+                    ignore_patterns=request.ignore_patterns,
+                    include_patterns=request.include_patterns,
+                    use_async=False
+                )
+            )
     
-    Returns:
-        bunkr链接列表
-    """
-    bunkr_pattern = re.compile(r'bunkr\.\w+')
-    bunkr_links = []
+    results = await asyncio.gather(
+        *(download_one(i, link) for i, link in enumerate(bunkr_links)),
+        return_exceptions=True
+    )
     
-    for link in external_links:
-        if bunkr_pattern.search(link):
-            bunkr_links.append(link)
+    download_results = []
+    errors = []
+    for link, result in zip(bunkr_links, results):
+        if isinstance(result, Exception):
+            error_msg = f"下载链接 {link} 失败: {str(result)}"
+            logger.error(error_msg)
+            errors.append(error_msg)
+            download_results.append({
+                "url": link,
+                "result": {"success": False, "error": str(result)}
+            })
+        else:
+            logger.info(f"链接 {link} 下载完成: {result}")
+            download_results.append({
+                "url": link,
+                "result": result
+            })
     
-    return bunkr_links
+    return download_results, errors
 
 @router.post("/download", response_model=DownloadResponse)
 async def download_post_bunkr_links(
@@ -342,25 +538,14 @@ async def download_post_bunkr_links(
     try:
         logger.info(f"开始处理下载请求 - Post ID: {request.post_id}, Thread URL: {request.thread_url}")
         
-        # 1. 获取帖子信息
-        post_data = get_post_by_id(request.post_id, request.thread_url)
-        if not post_data:
+        # 1. 查询帖子外部链接中的bunkr链接（在数据库中完成过滤）
+        bunkr_links = await run_in_threadpool(get_bunkr_links_for_post, request.post_id, request.thread_url)
+        if bunkr_links is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"未找到帖子 ID: {request.post_id} 在线程: {request.thread_url}"
             )
         
-        # 2. 提取外部链接
-        external_links = post_data.get('external_links', [])
-        if isinstance(external_links, str):
-            try:
-                external_links = json.loads(external_links)
-            except json.JSONDecodeError:
-                external_links = []
-        
-        # 3. 过滤出bunkr链接
-        bunkr_links = extract_bunkr_links(external_links)
-        
         if not bunkr_links:
             return DownloadResponse(
                 success=True,
@@ -374,40 +559,13 @@ async def download_post_bunkr_links(
         
         logger.info(f"找到 {len(bunkr_links)} 个bunkr链接: {bunkr_links}")
         
-        # 4. 后台执行下载任务
-        download_results = []
-        errors = []
-        
-        def download_task():
+        # 2. 后台执行下载任务
+        async def download_task():
             """后台下载任务"""
             try:
-                for i, link in enumerate(bunkr_links):
-                    logger.info(f"正在下载第 {i+1}/{len(bunkr_links)} 个链接: {link}")
-                    try:
-                        result = download_from_bunkr(
-                            url=link,
-                            download_dir=request.download_dir,
-                            ignore_patterns=request.ignore_patterns,
-                            include_patterns=request.include_patterns,
-                            use_async=False
-                        )
-                        download_results.append({
-                            "url": link,
-                            "result": result
-                        })
-                        logger.info(f"链接 {link} 下载完成: {result}")
-                    except Exception as e:
-                        error_msg = f"下载链接 {link} 失败: {str(e)}"
-                        logger.error(error_msg)
-                        errors.append(error_msg)
-                        download_results.append({
-                            "url": link,
-                            "result": {"success": False, "error": str(e)}
-                        })
-                        
+                await download_bunkr_links(bunkr_links, request)
             except Exception as e:
                 logger.error(f"下载任务执行失败: {str(e)}")
-                errors.append(f"下载任务执行失败: {str(e)}")
         
         # 添加后台任务
         background_tasks.add_task(download_task)
@@ -447,25 +605,14 @@ async def download_post_bunkr_links_sync(request: DownloadRequest):
     try:
         logger.info(f"开始处理同步下载请求 - Post ID: {request.post_id}, Thread URL: {request.thread_url}")
         
-        # 1. 获取帖子信息
-        post_data = get_post_by_id(request.post_id, request.thread_url)
-        if not post_data:
+        # 1. 查询帖子外部链接中的bunkr链接（在数据库中完成过滤）
+        bunkr_links = await run_in_threadpool(get_bunkr_links_for_post, request.post_id, request.thread_url)
+        if bunkr_links is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"未找到帖子 ID: {request.post_id} 在线程: {request.thread_url}"
             )
         
-        # 2. 提取外部链接
-        external_links = post_data.get('external_links', [])
-        if isinstance(external_links, str):
-            try:
-                external_links = json.loads(external_links)
-            except json.JSONDecodeError:
-                external_links = []
-        
-        # 3. 过滤出bunkr链接
-        bunkr_links = extract_bunkr_links(external_links)
-        
         if not bunkr_links:
             return DownloadResponse(
                 success=True,
@@ -479,33 +626,8 @@ async def download_post_bunkr_links_sync(request: DownloadRequest):
         
         logger.info(f"找到 {len(bunkr_links)} 个bunkr链接: {bunkr_links}")
         
-        # 4. 同步执行下载任务
-        download_results = []
-        errors = []
-        
-        for i, link in enumerate(bunkr_links):
-            logger.info(f"正在下载第 {i+1}/{len(bunkr_links)} 个链接: {link}")
-            try:
-                result = download_from_bunkr(
-                    url=link,
-                    download_dir=request.download_dir,
-                    ignore_patterns=request.ignore_patterns,
-                    include_patterns=request.include_patterns,
-                    use_async=False
-                )
-                download_results.append({
-                    "url": link,
-                    "result": result
-                })
-                logger.info(f"链接 {link} 下载完成: {result}")
-            except Exception as e:
-                error_msg = f"下载链接 {link} 失败: {str(e)}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-                download_results.append({
-                    "url": link,
-                    "result": {"success": False, "error": str(e)}
-                })
+        # 2. 并发执行下载任务并等待全部完成
+        download_results, errors = await download_bunkr_links(bunkr_links, request)
         
         # 统计成功的下载数量
         successful_downloads = sum(1 for result in download_results if result.get("result", {}).get("success", False))
@@ -1,7 +1,20 @@
+import os
+from functools import lru_cache
+
 import yaml
 
-def get_config(file_path: str):
-    file_yaml = open(file_path, "r", encoding="utf-8")
-    config = yaml.load(file_yaml, Loader=yaml.FullLoader)
-    return config
+# 优先使用libyaml的C实现解析配置
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
 
+@lru_cache(maxsize=8)
+def _load_config(file_path: str, mtime: float):
+    """按 (路径, 修改时间) 缓存解析结果，文件修改后自动重新解析"""
+    with open(file_path, "rb") as file_yaml:
+        return yaml.load(file_yaml, Loader=_Loader)
+
+def get_config(file_path: str):
+    # 返回的配置对象在调用方之间共享，只读使用
+    return _load_config(file_path, os.stat(file_path).st_mtime)
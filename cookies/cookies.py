@@ -1,13 +1,18 @@
-import json
+import logging
+import os
 import time
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, Iterable
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
+import orjson
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True, frozen=True)
 class Cookie:
-    """单个cookie的数据结构"""
+    """单个cookie的数据结构（不可变，更新cookie时整体替换实例）"""
     domain: str
     name: str
     value: str
@@ -20,17 +25,35 @@ class Cookie:
     session: bool = True
     storeId: str = "0"
     
-    def is_expired(self) -> bool:
-        """检查cookie是否已过期"""
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        """
+        检查cookie是否已过期
+        
+        Args:
+            now: 当前时间戳，批量检查时由调用方统一获取一次后传入
+        """
         if self.session or self.expirationDate is None:
             return False
-        return time.time() > self.expirationDate
+        if now is None:
+            now = time.time()
+        return now > self.expirationDate
+    
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        """cookie的唯一标识：(域名, 名称, 路径)"""
+        return (self.domain, self.name, self.path)
     
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式"""
-        result = asdict(self)
-        if self.expirationDate is None:
-            result.pop('expirationDate', None)
+        """转换为字典格式（字段均为标量，直接构造字典而不经过 asdict 的递归拷贝）"""
+        result = {"domain": self.domain, "name": self.name, "value": self.value, "path": self.path}
+        if self.expirationDate is not None:
+            result["expirationDate"] = self.expirationDate
+        result["hostOnly"] = self.hostOnly
+        result["httpOnly"] = self.httpOnly
+        result["sameSite"] = self.sameSite
+        result["secure"] = self.secure
+        result["session"] = self.session
+        result["storeId"] = self.storeId
         return result
 
 
@@ -40,42 +63,70 @@ class BrowserCookies:
     处理包含完整cookie属性的浏览器格式
     """
     
-    def __init__(self, file_path: Optional[str] = None):
+    def __init__(self, file_path: Optional[str] = None, verbose: bool = False):
         """
         初始化cookies类
         
         Args:
             file_path: cookies文件路径，默认为当前目录下的browser_cookies.json
+            verbose: 为True时以INFO级别输出加载、保存等操作日志，否则为DEBUG级别
         """
         if file_path is None:
             file_path = "browser_cookies.json"
         
         self.file_path = Path(file_path)
-        self._cookies: List[Cookie] = []
+        self._log_level = logging.INFO if verbose else logging.DEBUG
+        # 主索引：(域名, 名称, 路径) -> Cookie，字典保持插入顺序
+        self._by_key: Dict[Tuple[str, str, str], Cookie] = {}
+        # 域名索引：域名 -> {(域名, 名称, 路径) -> Cookie}
+        self._by_domain: Dict[str, Dict[Tuple[str, str, str], Cookie]] = {}
+        # get_primary_domain 的缓存：(主域名, 缓存失效时间)，cookies变化时置为None
+        self._primary_domain_cache: Optional[Tuple[Optional[str], Optional[float]]] = None
         self.load()
     
+    @property
+    def _cookies(self) -> List[Cookie]:
+        """按添加顺序排列的全部cookies"""
+        return list(self._by_key.values())
+    
+    def _set_cookies(self, cookies: Iterable[Cookie]) -> None:
+        """
+        用给定的cookies重建全部索引
+        
+        相同标识的cookie以最后一次出现的为准，并排在最后一次出现的位置，
+        与逐条追加到列表时同名cookie"靠后的为准"的顺序一致
+        """
+        self._by_key = {}
+        self._by_domain = {}
+        self._primary_domain_cache = None
+        for cookie in cookies:
+            key = cookie.key
+            if key in self._by_key:
+                del self._by_key[key]
+                del self._by_domain[cookie.domain][key]
+            self._index_cookie(cookie)
+    
+    def _index_cookie(self, cookie: Cookie) -> None:
+        """将cookie写入索引，已存在相同标识的cookie时原位替换"""
+        key = cookie.key
+        self._by_key[key] = cookie
+        self._by_domain.setdefault(cookie.domain, {})[key] = cookie
+        self._primary_domain_cache = None
+    
     def load(self) -> None:
         """从文件加载cookies"""
         try:
             if self.file_path.exists():
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    cookies_data = json.load(f)
-                
-                self._cookies = []
-                for cookie_data in cookies_data:
-                    # 处理可能缺失的字段
-                    if 'expirationDate' in cookie_data and cookie_data['expirationDate'] is None:
-                        cookie_data.pop('expirationDate')
-                    
-                    cookie = Cookie(**cookie_data)
-                    self._cookies.append(cookie)
+                cookies_data = orjson.loads(self.file_path.read_bytes())
                 
-                print(f"已从 {self.file_path} 加载 {len(self._cookies)} 个cookies")
+                # expirationDate 为 null 时与缺省值相同，可直接构造
+                self._set_cookies(Cookie(**cookie_data) for cookie_data in cookies_data)
+                logger.log(self._log_level, "已从 %s 加载 %d 个cookies", self.file_path, len(self._by_key))
             else:
-                print(f"cookies文件 {self.file_path} 不存在，将创建新文件")
-        except Exception as e:
-            print(f"加载cookies时出错: {e}")
-            self._cookies = []
+                logger.log(self._log_level, "cookies文件 %s 不存在，将创建新文件", self.file_path)
+        except Exception:
+            logger.exception("加载cookies时出错: %s", self.file_path)
+            self._set_cookies([])
     
     def save(self) -> None:
         """保存cookies到文件"""
@@ -84,16 +135,19 @@ class BrowserCookies:
             self.file_path.parent.mkdir(parents=True, exist_ok=True)
             
             # 过滤掉过期的cookies
-            valid_cookies = [cookie for cookie in self._cookies if not cookie.is_expired()]
+            now = time.time()
+            valid_cookies = [cookie for cookie in self._by_key.values() if not cookie.is_expired(now)]
             
             cookies_data = [cookie.to_dict() for cookie in valid_cookies]
             
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(cookies_data, f, ensure_ascii=False, indent=2)
+            # 先写入同目录下的临时文件再原子替换，进程中途退出也不会留下损坏的cookies文件
+            tmp_path = self.file_path.with_suffix(self.file_path.suffix + ".tmp")
+            tmp_path.write_bytes(orjson.dumps(cookies_data, option=orjson.OPT_INDENT_2))
+            os.replace(tmp_path, self.file_path)
             
-            print(f"已保存 {len(valid_cookies)} 个有效cookies到 {self.file_path}")
-        except Exception as e:
-            print(f"保存cookies时出错: {e}")
+            logger.log(self._log_level, "已保存 %d 个有效cookies到 %s", len(valid_cookies), self.file_path)
+        except Exception:
+            logger.exception("保存cookies时出错: %s", self.file_path)
     
     def add_cookie(self, cookie: Cookie) -> None:
         """
@@ -102,17 +156,8 @@ class BrowserCookies:
         Args:
             cookie: Cookie对象
         """
-        # 检查是否已存在相同的cookie（相同域名、名称、路径）
-        existing_index = self._find_cookie_index(cookie.domain, cookie.name, cookie.path)
-        
-        if existing_index is not None:
-            # 更新现有cookie
-            self._cookies[existing_index] = cookie
-            print(f"已更新cookie: {cookie.name} (domain: {cookie.domain})")
-        else:
-            # 添加新cookie
-            self._cookies.append(cookie)
-            print(f"已添加cookie: {cookie.name} (domain: {cookie.domain})")
+        # 相同域名、名称、路径的cookie原位替换
+        self._index_cookie(cookie)
     
     def add_cookies_from_dict(self, cookies_data: List[Dict[str, Any]]) -> None:
         """
@@ -121,16 +166,23 @@ class BrowserCookies:
         Args:
             cookies_data: cookie字典列表
         """
+        # 直接写入索引并只输出一次汇总，不逐条调用 add_cookie
+        added_count = 0
+        updated_count = 0
         for cookie_data in cookies_data:
             try:
-                # 处理可能缺失的字段
-                if 'expirationDate' in cookie_data and cookie_data['expirationDate'] is None:
-                    cookie_data.pop('expirationDate')
-                
                 cookie = Cookie(**cookie_data)
-                self.add_cookie(cookie)
-            except Exception as e:
-                print(f"添加cookie时出错: {e}, 数据: {cookie_data}")
+            except Exception:
+                logger.exception("添加cookie时出错, 数据: %s", cookie_data)
+                continue
+            
+            if cookie.key in self._by_key:
+                updated_count += 1
+            else:
+                added_count += 1
+            self._index_cookie(cookie)
+        
+        logger.log(self._log_level, "已批量添加 %d 个cookies，更新 %d 个cookies", added_count, updated_count)
     
     def get_cookie(self, name: str, domain: Optional[str] = None, path: str = "/") -> Optional[Cookie]:
         """
@@ -144,11 +196,15 @@ class BrowserCookies:
         Returns:
             Cookie对象或None
         """
-        for cookie in self._cookies:
+        if domain is not None:
+            cookie = self._by_key.get((domain, name, path))
+            return cookie if cookie is not None and not cookie.is_expired() else None
+        
+        now = time.time()
+        for cookie in self._by_key.values():
             if (cookie.name == name and 
                 cookie.path == path and 
-                (domain is None or cookie.domain == domain) and
-                not cookie.is_expired()):
+                not cookie.is_expired(now)):
                 return cookie
         return None
     
@@ -162,8 +218,9 @@ class BrowserCookies:
         Returns:
             Cookie对象列表
         """
-        return [cookie for cookie in self._cookies 
-                if cookie.domain == domain and not cookie.is_expired()]
+        now = time.time()
+        return [cookie for cookie in self._by_domain.get(domain, {}).values()
+                if not cookie.is_expired(now)]
     
     def get_cookie_value(self, name: str, domain: Optional[str] = None, path: str = "/") -> Optional[str]:
         """
@@ -192,13 +249,17 @@ class BrowserCookies:
         Returns:
             是否成功删除
         """
-        index = self._find_cookie_index(domain or "", name, path)
-        if index is not None:
-            deleted_cookie = self._cookies.pop(index)
-            print(f"已删除cookie: {deleted_cookie.name} (domain: {deleted_cookie.domain})")
+        deleted_cookie = self._by_key.pop((domain or "", name, path), None)
+        if deleted_cookie is not None:
+            domain_cookies = self._by_domain[deleted_cookie.domain]
+            del domain_cookies[deleted_cookie.key]
+            if not domain_cookies:
+                del self._by_domain[deleted_cookie.domain]
+            self._primary_domain_cache = None
+            logger.log(self._log_level, "已删除cookie: %s (domain: %s)", deleted_cookie.name, deleted_cookie.domain)
             return True
         else:
-            print(f"未找到cookie: {name} (domain: {domain}, path: {path})")
+            logger.log(self._log_level, "未找到cookie: %s (domain: %s, path: %s)", name, domain, path)
             return False
     
     def clear_expired(self) -> int:
@@ -208,17 +269,18 @@ class BrowserCookies:
         Returns:
             清除的cookie数量
         """
-        original_count = len(self._cookies)
-        self._cookies = [cookie for cookie in self._cookies if not cookie.is_expired()]
-        cleared_count = original_count - len(self._cookies)
+        original_count = len(self._by_key)
+        now = time.time()
+        self._set_cookies([cookie for cookie in self._by_key.values() if not cookie.is_expired(now)])
+        cleared_count = original_count - len(self._by_key)
         if cleared_count > 0:
-            print(f"已清除 {cleared_count} 个过期cookies")
+            logger.log(self._log_level, "已清除 %d 个过期cookies", cleared_count)
         return cleared_count
     
     def clear_all(self) -> None:
         """清空所有cookies"""
-        self._cookies.clear()
-        print("已清空所有cookies")
+        self._set_cookies([])
+        logger.log(self._log_level, "已清空所有cookies")
     
     def get_primary_domain(self) -> Optional[str]:
         """
@@ -228,11 +290,33 @@ class BrowserCookies:
         Returns:
             推断出的主域名，如果没有有效cookies则返回None
         """
+        # 结果在cookies变化或参与统计的cookie最早过期之前保持不变
+        now = time.time()
+        if self._primary_domain_cache is not None:
+            primary_domain, valid_until = self._primary_domain_cache
+            if valid_until is None or now <= valid_until:
+                return primary_domain
+        
+        primary_domain, valid_until = self._compute_primary_domain(now)
+        self._primary_domain_cache = (primary_domain, valid_until)
+        return primary_domain
+    
+    def _compute_primary_domain(self, now: float) -> Tuple[Optional[str], Optional[float]]:
+        """
+        统计有效cookies推断主域名
+        
+        Returns:
+            (主域名, 参与统计的cookie中最早的过期时间)
+        """
         domain_counts = {}
         simpcity_domains = []
+        earliest_expiration = None
         
-        for cookie in self._cookies:
-            if not cookie.is_expired():
+        for cookie in self._by_key.values():
+            if not cookie.is_expired(now):
+                if not cookie.session and cookie.expirationDate is not None:
+                    if earliest_expiration is None or cookie.expirationDate < earliest_expiration:
+                        earliest_expiration = cookie.expirationDate
                 domain = cookie.domain
                 # 移除域名前的点号
                 clean_domain = domain.lstrip('.')
@@ -246,15 +330,15 @@ class BrowserCookies:
                         simpcity_domains.append(clean_domain)
         
         if not domain_counts:
-            return None
+            return None, earliest_expiration
         
         # 优先返回simpcity相关域名
         if simpcity_domains:
             # 返回cookie数量最多的simpcity域名
-            return max(simpcity_domains, key=lambda d: domain_counts.get(d, 0))
+            return max(simpcity_domains, key=lambda d: domain_counts.get(d, 0)), earliest_expiration
         
         # 否则返回cookie数量最多的域名
-        return max(domain_counts.keys(), key=lambda d: domain_counts[d])
+        return max(domain_counts.keys(), key=lambda d: domain_counts[d]), earliest_expiration
     
     def to_requests_cookies(self, domain: Optional[str] = None) -> Dict[str, str]:
         """
@@ -266,32 +350,39 @@ class BrowserCookies:
         Returns:
             requests格式的cookies字典
         """
+        if domain is None:
+            candidates = self._by_key.values()
+        else:
+            exact_cookies = self._by_domain.get(domain)
+            dotted_cookies = self._by_domain.get(f".{domain}")
+            if exact_cookies and dotted_cookies:
+                # 两种域名写法都有时按整体添加顺序合并，同名cookie仍以靠后的为准
+                dotted_domain = f".{domain}"
+                candidates = [
+                    cookie for cookie in self._by_key.values()
+                    if cookie.domain == domain or cookie.domain == dotted_domain
+                ]
+            else:
+                candidates = (exact_cookies or dotted_cookies or {}).values()
+        
+        now = time.time()
         cookies_dict = {}
-        for cookie in self._cookies:
-            if not cookie.is_expired():
-                if domain is None or cookie.domain == domain or cookie.domain == f".{domain}":
-                    cookies_dict[cookie.name] = cookie.value
+        for cookie in candidates:
+            if not cookie.is_expired(now):
+                cookies_dict[cookie.name] = cookie.value
         return cookies_dict
     
-    def _find_cookie_index(self, domain: str, name: str, path: str) -> Optional[int]:
-        """查找cookie在列表中的索引"""
-        for i, cookie in enumerate(self._cookies):
-            if (cookie.domain == domain and 
-                cookie.name == name and 
-                cookie.path == path):
-                return i
-        return None
-    
     def __len__(self) -> int:
         """返回有效cookies数量"""
-        return len([cookie for cookie in self._cookies if not cookie.is_expired()])
+        now = time.time()
+        return sum(1 for cookie in self._by_key.values() if not cookie.is_expired(now))
     
     def __str__(self) -> str:
         """返回cookies的字符串表示"""
-        valid_count = len([cookie for cookie in self._cookies if not cookie.is_expired()])
-        return f"BrowserCookies({valid_count} valid items, {len(self._cookies)} total)"
+        valid_count = len(self)
+        return f"BrowserCookies({valid_count} valid items, {len(self._by_key)} total)"
     
     def __repr__(self) -> str:
         """返回cookies的详细表示"""
-        return f"BrowserCookies(file_path='{self.file_path}', items={len(self._cookies)})"
+        return f"BrowserCookies(file_path='{self.file_path}', items={len(self._by_key)})"
 
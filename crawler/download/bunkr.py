@@ -13,26 +13,44 @@
 # limitations under the License.
 
 import requests
-from bs4 import BeautifulSoup, Tag
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 import time
 import random
-import json
 import logging
 import re
 import os
 import base64
-import hashlib
 import asyncio
+import threading
+import copy
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import aiohttp
-from datetime import datetime
-from urllib.parse import urljoin, urlparse, parse_qs, unquote, urlunparse
-from typing import Dict, Any, Optional, List, Union, Tuple
-import mimetypes
+import orjson
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, unquote, urlunparse, ParseResult
+from typing import Dict, Any, Optional, List, Union, Tuple, NamedTuple
 from pathlib import Path
-from itertools import cycle
 from math import floor
 import html
 
+# 优先使用基于C实现的lxml解析页面
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# 便捷函数自建事件循环时优先使用uvloop（随 uvicorn[standard] 安装，Windows上没有）
+try:
+    import uvloop
+    _EVENT_LOOP_FACTORY = uvloop.new_event_loop
+except ImportError:
+    _EVENT_LOOP_FACTORY = None
+
 
 class BunkrConfig:
     """Bunkr下载器配置类"""
@@ -60,6 +78,13 @@ class BunkrConfig:
     # 大文件默认块大小
     LARGE_FILE_CHUNK_SIZE = 16 * MB
     
+    # 异步下载时攒够该大小再写盘（aiohttp 每次返回的数据量由网络决定）
+    WRITE_BUFFER_SIZE = 1 * MB
+    
+    # 下载完成后、重命名为最终文件名前先 fsync，保证崩溃后最终文件名下不会出现不完整的文件；
+    # 关闭后省去每个文件一次刷盘等待，但也不再释放页缓存（未落盘的脏页无法释放）
+    DURABLE_WRITES = True
+    
     # HTTP状态码
     HTTP_STATUS_OK = 200
     HTTP_STATUS_FORBIDDEN = 403
@@ -92,6 +117,294 @@ class BunkrConfig:
     
     # 最大重试次数
     MAX_RETRIES = 5
+    
+    # 下载进度日志的最小间隔（秒）
+    PROGRESS_LOG_INTERVAL = 5
+    
+    # 请求过多（429/503）时的退避：min(上限, 基数 * 2^重试次数) 秒加随机抖动；
+    # 服务器给出 Retry-After 时以其为准，但不超过 MAX_RETRY_AFTER
+    BACKOFF_BASE = 3
+    BACKOFF_CAP = 60
+    MAX_RETRY_AFTER = 300
+    
+    # 同一主机相邻两次请求开始的平均间隔（秒），实际间隔在其0.5到1.5倍之间随机，
+    # 并发下载时避免一开始就集中请求触发限流；每个进程各自计算
+    HOST_REQUEST_INTERVAL = 0.5
+
+
+# 模块级预编译的正则表达式，所有下载器实例和线程共用
+_VALID_SLUG_RE = re.compile(BunkrConfig.VALID_SLUG_REGEX)
+_MEDIA_SLUG_RE = re.compile(BunkrConfig.MEDIA_SLUG_REGEX)
+# 直接在原始页面字节上查找slug，无需解码和遍历script标签
+_MEDIA_SLUG_BYTES_RE = re.compile(BunkrConfig.MEDIA_SLUG_REGEX.encode())
+_BUNKR_HOST_RE = re.compile(r'bunkr\.\w+')
+_UNSAFE_FN_RE = re.compile(r'[<>:"/\\|?*]')
+
+# 文件名过滤模式少于该数量时直接逐个比较子串，否则合并为一个正则一次扫描
+PATTERN_REGEX_THRESHOLD = 4
+
+@lru_cache(maxsize=64)
+def _compile_patterns(patterns: Tuple[str, ...]) -> "re.Pattern[str]":
+    """将多个子串模式合并为一个正则，同一组模式只编译一次"""
+    return re.compile("|".join(map(re.escape, patterns)))
+
+def _find_pattern(filename: str, patterns: List[str]) -> Optional[str]:
+    """
+    查找文件名中出现的第一个模式
+    
+    Args:
+        filename: 文件名
+        patterns: 子串模式列表
+        
+    Returns:
+        匹配到的模式，没有匹配时返回None
+    """
+    if len(patterns) < PATTERN_REGEX_THRESHOLD:
+        for pattern in patterns:
+            if pattern in filename:
+                return pattern
+        return None
+    
+    match = _compile_patterns(tuple(patterns)).search(filename)
+    return match.group(0) if match else None
+
+@lru_cache(maxsize=8)
+def _keystream(hour_bucket: int, length: int) -> int:
+    """
+    生成与密文等长的解密密钥流（以大整数表示）
+    
+    密钥按小时轮换，同一小时内同长度的密文共用结果
+    
+    Args:
+        hour_bucket: floor(timestamp / 3600)
+        length: 密文字节数
+        
+    Returns:
+        密钥流对应的大端整数
+    """
+    base = f"SECRET_KEY_{hour_bucket}".encode("utf-8")
+    return int.from_bytes((base * (length // len(base) + 1))[:length], "big")
+
+class _UrlInfo(NamedTuple):
+    """一次解析得到的URL各部分"""
+    parsed: ParseResult
+    netloc: str
+    # 按 "/" 切分的原始URL，倒数第二段即 a/f/v 类型标记
+    parts: Tuple[str, ...]
+    decoded: str
+    # 解码后去掉末尾 "/" 的最后一段（相册ID或媒体slug）
+    tail: str
+
+@lru_cache(maxsize=4096)
+def _parse_url(url: str) -> _UrlInfo:
+    """
+    解析URL并缓存结果
+    
+    同一链接在类型判断、主机退避、slug提取、文件名提取等环节都会用到，
+    解析一次后各环节共用
+    
+    Args:
+        url: 任意URL
+        
+    Returns:
+        _UrlInfo
+    """
+    parsed = urlparse(url)
+    decoded = unquote(url)
+    return _UrlInfo(
+        parsed=parsed,
+        netloc=parsed.netloc,
+        parts=tuple(url.split("/")),
+        decoded=decoded,
+        tail=decoded.rstrip("/").split("/")[-1],
+    )
+
+# 页面解析时只构建需要的标签，跳过其余节点的建树开销
+# 相册页只需要文件链接；文件页只需要文件名标题（slug直接从原始页面中查找）
+ALBUM_PAGE_STRAINER = SoupStrainer("a", href=True)
+ITEM_PAGE_STRAINER = SoupStrainer("h1")
+# 状态页只需要各服务器所在的行
+STATUS_ROW_ATTRS = {"class": "flex items-center gap-4 py-4 border-b border-soft last:border-b-0"}
+STATUS_ROW_STRAINER = SoupStrainer("div", STATUS_ROW_ATTRS)
+
+
+class _TTLCache:
+    """线程安全的进程内TTL缓存，超出容量时淘汰最早写入的条目"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> Any:
+        """返回未过期的缓存值，不存在或已过期时返回None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            return entry[1]
+    
+    def set(self, key: Any, value: Any) -> None:
+        """写入缓存值"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+# 文件页URL -> (slug, 页面上的文件名)，页面内容基本不变
+_item_page_cache = _TTLCache(maxsize=256, ttl=3600)
+# (slug, 小时) -> API响应，解密密钥按小时轮换，因此按小时分桶
+_api_response_cache = _TTLCache(maxsize=1024, ttl=3600)
+# 相册URL -> 文件链接列表，相册内容很少变化
+_album_links_cache = _TTLCache(maxsize=64, ttl=600)
+# 文件页URL -> 清理后的最终文件名，与按小时轮换的下载链接无关，重复下载同一相册时用于免请求跳过
+_resolved_filename_cache = _TTLCache(maxsize=4096, ttl=86400)
+
+
+class _OverlappedWriter:
+    """
+    在后台线程中顺序写文件的写入器
+
+    当前块写入磁盘的同时，调用方可以继续接收下一块；提交下一块前等待上一块写完，
+    同一时刻只有一个写入在进行，保证写入顺序
+    """
+    
+    def __init__(self, file):
+        self._write = file.write
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bunkr-writer")
+        self._pending = None
+    
+    def write(self, chunk: bytes) -> None:
+        if self._pending is not None:
+            self._pending.result()
+        self._pending = self._executor.submit(self._write, chunk)
+    
+    def close(self) -> None:
+        """等待最后一块写完并结束写入线程"""
+        try:
+            if self._pending is not None:
+                self._pending.result()
+        finally:
+            self._executor.shutdown()
+
+# 一次 writev 提交的缓冲区个数上限（Linux 的 IOV_MAX 为1024）
+_WRITEV_MAX_BUFFERS = 512
+
+def _write_chunks(file, chunks: List[bytes]) -> None:
+    """
+    将多个块按顺序写入文件
+    
+    支持 writev 的平台上一次系统调用交给内核，省去拼接的内存拷贝；否则拼接后写入。
+    文件对象本身不应再有未刷新的缓冲数据
+    """
+    if not hasattr(os, "writev"):
+        file.write(b"".join(chunks))
+        return
+    
+    fd = file.fileno()
+    remaining = sum(len(chunk) for chunk in chunks)
+    while True:
+        written = os.writev(fd, chunks)
+        remaining -= written
+        if remaining <= 0:
+            return
+        # 部分写入：丢弃已写完的块，从未写完的块的剩余部分继续
+        index = 0
+        while written >= len(chunks[index]):
+            written -= len(chunks[index])
+            index += 1
+        chunks = [memoryview(chunks[index])[written:], *chunks[index + 1:]]
+
+def _sync_and_release(file) -> None:
+    """
+    文件写完后落盘并通知内核不再需要其页缓存
+    
+    先 fsync 再重命名，最终文件名下的文件一定是完整写入的；落盘后页面不再是脏页，
+    POSIX_FADV_DONTNEED 才能真正释放它们，批量下载的大文件不会挤占其他进程的热数据。
+    BunkrConfig.DURABLE_WRITES 为False时只刷新Python缓冲区
+    """
+    file.flush()
+    if not BunkrConfig.DURABLE_WRITES:
+        return
+    
+    fd = file.fileno()
+    os.fsync(fd)
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+
+class _HostBackoff:
+    """
+    按主机记录的退避与请求节奏，进程内所有下载线程和协程共用
+
+    同一主机的请求开始时间之间至少相隔约 HOST_REQUEST_INTERVAL 秒；
+    某个主机返回429/503后，在退避结束前发往该主机的请求都先等待，
+    其他主机的下载不受影响
+    """
+    
+    def __init__(self):
+        self._until: Dict[str, float] = {}
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def reserve(self, url: str) -> float:
+        """
+        为发往该URL所在主机的下一个请求预约开始时间
+        
+        Args:
+            url: 请求URL
+            
+        Returns:
+            请求前需要等待的秒数（包含退避期）
+        """
+        host = _parse_url(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._until.get(host, 0.0), self._next_slot.get(host, 0.0))
+            self._next_slot[host] = start + BunkrConfig.HOST_REQUEST_INTERVAL * random.uniform(0.5, 1.5)
+        return start - now
+    
+    def penalize(self, url: str, delay: float) -> None:
+        """让该URL所在主机在 delay 秒内暂停请求"""
+        host = _parse_url(url).netloc
+        with self._lock:
+            until = time.monotonic() + delay
+            if until > self._until.get(host, 0.0):
+                self._until[host] = until
+
+
+_host_backoff = _HostBackoff()
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    计算请求过多时的重试等待时间
+    
+    Args:
+        attempt: 当前重试次数（从0开始）
+        retry_after: 响应中的 Retry-After 头，可以是秒数或HTTP日期
+        
+    Returns:
+        等待秒数
+    """
+    if retry_after:
+        try:
+            if retry_after.strip().isdigit():
+                delay = float(retry_after)
+            else:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            return min(max(delay, 0.0), BunkrConfig.MAX_RETRY_AFTER)
+        except (TypeError, ValueError):
+            pass
+    return min(BunkrConfig.BACKOFF_CAP, BunkrConfig.BACKOFF_BASE * 2 ** attempt) + random.uniform(1, 3)
 
 
 class BunkrStatusManager:
@@ -101,6 +414,8 @@ class BunkrStatusManager:
         self.status_cache = {}
         self.last_update = 0
         self.cache_duration = 300  # 5分钟缓存
+        # 缓存过期时只由一个线程刷新，其余线程等待后直接使用新结果
+        self._refresh_lock = threading.Lock()
     
     def get_bunkr_status(self) -> Dict[str, str]:
         """获取bunkr服务器状态"""
@@ -110,33 +425,35 @@ class BunkrStatusManager:
         if current_time - self.last_update < self.cache_duration and self.status_cache:
             return self.status_cache
         
-        try:
-            response = requests.get(BunkrConfig.STATUS_PAGE, headers=BunkrConfig.HEADERS, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            bunkr_status = {}
-            
-            server_items = soup.find_all(
-                "div",
-                {"class": "flex items-center gap-4 py-4 border-b border-soft last:border-b-0"}
-            )
-            
-            for server_item in server_items:
-                try:
-                    server_name = server_item.find("p").get_text(strip=True)
-                    server_status = server_item.find("span").get_text(strip=True)
-                    bunkr_status[server_name] = server_status
-                except AttributeError:
-                    continue
+        with self._refresh_lock:
+            # 等待锁期间其他线程可能已完成刷新
+            current_time = time.time()
+            if current_time - self.last_update < self.cache_duration and self.status_cache:
+                return self.status_cache
             
-            self.status_cache = bunkr_status
-            self.last_update = current_time
-            return bunkr_status
-            
-        except Exception as e:
-            logging.warning(f"获取服务器状态失败: {e}")
-            return self.status_cache or {}
+            try:
+                response = _get_http_session().get(BunkrConfig.STATUS_PAGE, timeout=10)
+                response.raise_for_status()
+                
+                # 只构建服务器行，行内的名称和状态在很小的子树中查找
+                soup = BeautifulSoup(response.content, HTML_PARSER, from_encoding='utf-8', parse_only=STATUS_ROW_STRAINER)
+                bunkr_status = {}
+                
+                for server_item in soup.find_all("div", STATUS_ROW_ATTRS):
+                    try:
+                        server_name = server_item.find("p").get_text(strip=True)
+                        server_status = server_item.find("span").get_text(strip=True)
+                        bunkr_status[server_name] = server_status
+                    except AttributeError:
+                        continue
+                
+                self.status_cache = bunkr_status
+                self.last_update = current_time
+                return bunkr_status
+                
+            except Exception as e:
+                logging.warning(f"获取服务器状态失败: {e}")
+                return self.status_cache or {}
     
     def get_offline_servers(self) -> Dict[str, str]:
         """获取离线服务器列表"""
@@ -149,8 +466,7 @@ class BunkrStatusManager:
     
     def get_subdomain(self, download_link: str) -> str:
         """从URL中提取子域名"""
-        netloc = urlparse(download_link).netloc
-        return netloc.split(".")[0].capitalize()
+        return _parse_url(download_link).netloc.split(".")[0].capitalize()
     
     def subdomain_is_offline(self, download_link: str) -> bool:
         """检查子域名是否离线"""
@@ -165,6 +481,60 @@ class BunkrStatusManager:
         return subdomain
 
 
+# 进程内共享的服务器状态，状态页在缓存有效期内只请求一次，某个链接标记的离线子域名对后续下载同样生效
+_shared_status_manager = BunkrStatusManager()
+
+# 每个下载线程复用一个HTTP会话，同一线程上的后续链接可以直接复用已建立的TCP/TLS连接
+_http_local = threading.local()
+
+def _get_http_session() -> requests.Session:
+    """
+    获取当前线程共享的requests会话
+    
+    requests.Session 不保证线程安全，因此按线程缓存
+    
+    Returns:
+        当前线程的requests.Session对象
+    """
+    session = getattr(_http_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(BunkrConfig.HEADERS)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_local.session = session
+    return session
+
+def _clone_session(session: requests.Session) -> requests.Session:
+    """
+    复制调用方提供的会话，供其他下载线程使用
+    
+    复制请求头、cookies、代理、认证、证书等配置；适配器（连接池）与原会话共用，
+    因此克隆的会话不应关闭
+    
+    Args:
+        session: 调用方提供的requests.Session
+        
+    Returns:
+        配置相同的新会话
+    """
+    clone = requests.Session()
+    clone.headers = session.headers.copy()
+    clone.cookies = session.cookies.copy()
+    clone.auth = session.auth
+    clone.proxies = dict(session.proxies)
+    clone.hooks = {event: list(hooks) for event, hooks in session.hooks.items()}
+    clone.params = dict(session.params)
+    clone.stream = session.stream
+    clone.verify = session.verify
+    clone.cert = session.cert
+    clone.max_redirects = session.max_redirects
+    clone.trust_env = session.trust_env
+    clone.adapters = OrderedDict(session.adapters)
+    return clone
+
+
 class BunkrDownloader:
     """Bunkr下载器类，支持从bunkr网站下载图片和视频"""
     
@@ -179,7 +549,9 @@ class BunkrDownloader:
         self.download_dir = Path(download_dir)
         self.download_dir.mkdir(exist_ok=True)
         
-        # 设置session
+        # 设置session；未提供或使用的是当前线程共享的会话时，相册下载的各线程改用各自线程的共享会话，
+        # 否则按调用方的会话复制出各线程的会话，保留其代理、cookies、请求头等配置
+        self._default_session = session is None or session is getattr(_http_local, "session", None)
         if session is None:
             self.session = requests.Session()
             self.session.headers.update(BunkrConfig.HEADERS)
@@ -190,11 +562,47 @@ class BunkrDownloader:
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger(__name__)
         
-        # 初始化状态管理器
-        self.status_manager = BunkrStatusManager()
+        # 使用进程内共享的状态管理器
+        self.status_manager = _shared_status_manager
+        
+        # 异步请求共用的aiohttp会话，首次使用时创建
+        self._aio_session: Optional[aiohttp.ClientSession] = None
+    
+    async def _get_aio_session(self) -> aiohttp.ClientSession:
+        """
+        获取共用的aiohttp会话
+        
+        同一下载器内的异步请求复用连接池和keep-alive连接，
+        避免每个文件都重新进行DNS解析、TCP握手和TLS协商
         
-        # bunkr域名正则表达式
-        self.bunkr_pattern = re.compile(r'bunkr\.\w+')
+        Returns:
+            aiohttp会话
+        """
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(
+                headers=BunkrConfig.HEADERS,
+                connector=aiohttp.TCPConnector(
+                    limit=64,
+                    limit_per_host=8,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60
+                )
+            )
+        return self._aio_session
+    
+    async def aclose(self) -> None:
+        """关闭共用的aiohttp会话"""
+        if self._aio_session is not None and not self._aio_session.closed:
+            await self._aio_session.close()
+        self._aio_session = None
+    
+    async def __aenter__(self):
+        """异步上下文管理器入口"""
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """异步上下文管理器出口"""
+        await self.aclose()
     
     def is_bunkr_url(self, url: str) -> bool:
         """
@@ -206,7 +614,7 @@ class BunkrDownloader:
         Returns:
             True如果是bunkr URL
         """
-        return bool(self.bunkr_pattern.search(url))
+        return bool(_BUNKR_HOST_RE.search(url))
     
     def get_url_type(self, url: str) -> str:
         """
@@ -223,11 +631,10 @@ class BunkrDownloader:
         """
         url_mapping = {"a": "album", "f": "file", "v": "video"}
         
-        try:
-            url_type = url.split("/")[-2]
-            return url_mapping.get(url_type, "unknown")
-        except IndexError:
+        parts = _parse_url(url).parts
+        if len(parts) < 2:
             return "unknown"
+        return url_mapping.get(parts[-2], "unknown")
     
     def change_domain_to_cr(self, url: str) -> str:
         """
@@ -239,14 +646,11 @@ class BunkrDownloader:
         Returns:
             使用bunkr.cr域名的URL
         """
-        parsed = urlparse(url)
-        new_parsed = parsed._replace(netloc="bunkr.cr")
-        return urlunparse(new_parsed)
+        return urlunparse(_parse_url(url).parsed._replace(netloc="bunkr.cr"))
     
     def get_host_page(self, url: str) -> str:
         """获取主机页面URL"""
-        url_netloc = urlparse(url).netloc
-        return f"https://{url_netloc}"
+        return f"https://{_parse_url(url).netloc}"
     
     def extract_file_links_from_album(self, album_url: str) -> List[str]:
         """
@@ -258,13 +662,18 @@ class BunkrDownloader:
         Returns:
             文件URL列表
         """
+        cached_links = _album_links_cache.get(album_url)
+        if cached_links is not None:
+            self.logger.info(f"使用缓存的相册链接: {album_url} ({len(cached_links)} 个)")
+            return list(cached_links)
+        
         try:
             self.logger.info(f"正在提取相册链接: {album_url}")
             
             response = self.session.get(album_url, timeout=15)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(response.content, HTML_PARSER, from_encoding='utf-8', parse_only=ALBUM_PAGE_STRAINER)
             
             # 查找所有文件链接
             file_links = []
@@ -283,63 +692,69 @@ class BunkrDownloader:
                     self.logger.debug(f"找到文件链接: {full_url}")
             
             self.logger.info(f"从相册中提取到 {len(file_links)} 个文件链接")
+            if file_links:
+                _album_links_cache.set(album_url, tuple(file_links))
             return file_links
             
         except Exception as e:
             self.logger.error(f"提取相册链接失败: {e}")
             return []
     
-    def get_identifier(self, url: str, soup: Optional[BeautifulSoup] = None) -> str:
+    def get_identifier(self, url: str, soup: Optional[BeautifulSoup] = None, page_content: Optional[bytes] = None) -> str:
         """
         从URL中提取标识符
         
         Args:
             url: bunkr URL
             soup: 可选的BeautifulSoup对象
+            page_content: 可选的原始页面内容
             
         Returns:
             标识符字符串
         """
-        decoded_url = unquote(url)
+        decoded_url = _parse_url(url).decoded
         
         try:
             url_type = self.get_url_type(decoded_url)
             if url_type == 'album':
                 return self.get_album_id(decoded_url)
             else:
-                return self.get_media_slug(decoded_url, soup)
+                return self.get_media_slug(decoded_url, soup, page_content)
         except IndexError:
             self.logger.error("提取标识符时出错")
             return url.split('/')[-1] or "unknown"
     
     def get_album_id(self, url: str) -> str:
         """从URL中提取相册ID"""
-        try:
-            return url.rstrip('/').split("/")[-1]
-        except IndexError:
-            self.logger.error("无效的URL格式")
-            return "unknown"
+        return _parse_url(url).tail
     
-    def get_media_slug(self, url: str, soup: Optional[BeautifulSoup]) -> str:
+    def get_media_slug(self, url: str, soup: Optional[BeautifulSoup], page_content: Optional[bytes] = None) -> str:
         """
         提取媒体slug
         
         Args:
             url: 媒体URL
             soup: HTML soup对象
+            page_content: 可选的原始页面内容，提供时直接在其中查找slug
             
         Returns:
             媒体slug
         """
-        media_slug = url.rstrip("/").split("/")[-1]
-        if re.fullmatch(BunkrConfig.VALID_SLUG_REGEX, media_slug):
+        media_slug = _parse_url(url).tail
+        if _VALID_SLUG_RE.fullmatch(media_slug):
             return media_slug
         
-        # 回退：从script标签中查找slug
+        # 回退：在原始页面中查找slug，一次正则扫描即可
+        if page_content:
+            match = _MEDIA_SLUG_BYTES_RE.search(page_content)
+            if match:
+                return match.group(1).decode("ascii")
+        
+        # 未提供原始页面时从script标签中查找slug
         if soup:
             for item in soup.find_all("script"):
                 script_text = item.get_text()
-                match = re.search(BunkrConfig.MEDIA_SLUG_REGEX, script_text)
+                match = _MEDIA_SLUG_RE.search(script_text)
                 if match:
                     return match.group(1)
         
@@ -369,23 +784,42 @@ class BunkrDownloader:
         )
         
         if filename_container:
-            filename = filename_container.get_text(strip=True)
-            return filename.encode("latin1").decode("utf-8")
+            # 页面按UTF-8解码后传入，文件名无需再做编码修正
+            return filename_container.get_text(strip=True)
         
         return "unknown_file"
     
-    def get_api_response(self, item_url: str, soup: Optional[BeautifulSoup] = None) -> Optional[Dict[str, Any]]:
+    def get_api_response(self, item_url: str, soup: Optional[BeautifulSoup] = None, page_content: Optional[bytes] = None) -> Optional[Dict[str, Any]]:
         """
         从Bunkr API获取加密数据
         
         Args:
             item_url: 项目URL
             soup: 可选的BeautifulSoup对象
+            page_content: 可选的原始页面内容
             
         Returns:
             API响应数据
         """
-        slug = self.get_identifier(item_url, soup)
+        slug = self.get_identifier(item_url, soup, page_content)
+        return self.fetch_api_response(slug)
+    
+    def fetch_api_response(self, slug: str) -> Optional[Dict[str, Any]]:
+        """
+        按slug请求Bunkr API的加密数据
+        
+        解密密钥按小时轮换，成功的响应按 (slug, 当前小时) 缓存，同一小时内重复请求直接返回
+        
+        Args:
+            slug: 媒体slug
+            
+        Returns:
+            API响应数据
+        """
+        cache_key = (slug, int(time.time() // 3600))
+        cached = _api_response_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         try:
             response = self.session.post(BunkrConfig.BUNKR_API, json={"slug": slug}, timeout=15)
@@ -393,9 +827,41 @@ class BunkrDownloader:
                 self.logger.warning(f"获取slug '{slug}' 的加密数据失败")
                 return None
             
-            return response.json()
+            api_response = orjson.loads(response.content)
+            _api_response_cache.set(cache_key, api_response)
+            return api_response
             
-        except requests.RequestException as e:
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
+            self.logger.error(f"请求slug '{slug}' 的加密数据时出错: {e}")
+            return None
+    
+    async def fetch_api_response_async(self, slug: str) -> Optional[Dict[str, Any]]:
+        """
+        异步按slug请求Bunkr API的加密数据，与 fetch_api_response 共用缓存
+        
+        Args:
+            slug: 媒体slug
+            
+        Returns:
+            API响应数据
+        """
+        cache_key = (slug, int(time.time() // 3600))
+        cached = _api_response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            session = await self._get_aio_session()
+            async with session.post(BunkrConfig.BUNKR_API, json={"slug": slug}, timeout=15) as response:
+                if response.status != BunkrConfig.HTTP_STATUS_OK:
+                    self.logger.warning(f"获取slug '{slug}' 的加密数据失败")
+                    return None
+                
+                api_response = orjson.loads(await response.read())
+            _api_response_cache.set(cache_key, api_response)
+            return api_response
+            
+        except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
             self.logger.error(f"请求slug '{slug}' 的加密数据时出错: {e}")
             return None
     
@@ -419,17 +885,12 @@ class BunkrDownloader:
             self.logger.error(f"解码加密数据失败: {e}")
             return ""
         
-        # 基于时间戳生成密钥
-        time_key = floor(timestamp / 3600)
-        secret_key = f"SECRET_KEY_{time_key}"
-        
-        # 创建密钥的循环迭代器
-        secret_key_bytes = secret_key.encode("utf-8")
-        cycled_key = cycle(secret_key_bytes)
-        
-        # 解密数据
+        # 解密数据：基于时间戳的密钥流与密文按大整数一次完成整段异或
         try:
-            decrypted_bytes = bytearray(byte ^ next(cycled_key) for byte in encrypted_bytes)
+            length = len(encrypted_bytes)
+            decrypted_bytes = (
+                int.from_bytes(encrypted_bytes, "big") ^ _keystream(floor(timestamp / 3600), length)
+            ).to_bytes(length, "big")
             decrypted_url = decrypted_bytes.decode("utf-8", errors="ignore")
             
             self.logger.debug(f"成功解密URL: {decrypted_url[:50]}...")
@@ -441,8 +902,7 @@ class BunkrDownloader:
     
     def get_url_based_filename(self, download_link: str) -> str:
         """从下载链接中提取文件名"""
-        parsed_url = urlparse(download_link)
-        return parsed_url.path.split("/")[-1]
+        return _parse_url(download_link).parsed.path.split("/")[-1]
     
     def format_item_filename(self, original_filename: str, url_based_filename: str) -> str:
         """
@@ -469,6 +929,22 @@ class BunkrDownloader:
         # 用连字符组合基本名称并添加扩展名
         return f"{original_base}-{url_base}{extension}"
     
+    def get_temp_file_path(self, file_path: Path) -> Path:
+        """
+        获取下载中使用的临时文件路径
+        
+        临时文件必须与目标文件位于同一目录：下载完成后的重命名因此总在同一文件系统内，
+        是原子且不复制数据的操作。在完整文件名后追加后缀，避免同名不同扩展名的文件
+        并发下载时共用同一个临时文件
+        
+        Args:
+            file_path: 目标文件路径
+            
+        Returns:
+            临时文件路径
+        """
+        return file_path.with_name(file_path.name + '.temp')
+    
     def get_chunk_size(self, file_size: int) -> int:
         """根据文件大小确定最优块大小"""
         for threshold, chunk_size in BunkrConfig.THRESHOLDS:
@@ -498,6 +974,11 @@ class BunkrDownloader:
                         return False
                     continue
                 
+                # 按主机的请求节奏及退避期等待，只阻塞当前下载线程
+                wait = _host_backoff.reserve(url)
+                if wait > 0:
+                    time.sleep(wait)
+                
                 if attempt == 0:
                     self.logger.info(f"正在下载文件: {file_path.name}")
                 else:
@@ -517,30 +998,46 @@ class BunkrDownloader:
                     self.logger.warning("响应头中未提供Content-Length")
                 
                 # 创建临时文件
-                temp_file_path = file_path.with_suffix('.temp')
+                temp_file_path = self.get_temp_file_path(file_path)
                 
                 chunk_size = self.get_chunk_size(file_size)
                 total_downloaded = 0
                 
+                # 按时间间隔输出下载进度；循环内用到的方法预先绑定为局部变量
+                monotonic = time.monotonic
+                last_log = monotonic()
                 with open(temp_file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=chunk_size):
-                        if chunk:
-                            f.write(chunk)
-                            total_downloaded += len(chunk)
-                            
-                            # 显示下载进度
-                            if file_size > 0 and total_downloaded % (chunk_size * 100) == 0:
-                                progress = (total_downloaded / file_size) * 100
-                                self.logger.info(f"下载进度: {progress:.1f}% ({total_downloaded}/{file_size})")
+                    # 大文件的块较大，写入放到后台线程，与接收下一块重叠进行
+                    writer = _OverlappedWriter(f) if chunk_size >= BunkrConfig.LARGE_FILE_CHUNK_SIZE else None
+                    write = writer.write if writer is not None else f.write
+                    try:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if chunk:
+                                write(chunk)
+                                total_downloaded += len(chunk)
+                                
+                                # 显示下载进度
+                                now = monotonic()
+                                if now - last_log >= BunkrConfig.PROGRESS_LOG_INTERVAL:
+                                    last_log = now
+                                    if file_size > 0:
+                                        progress = (total_downloaded / file_size) * 100
+                                        self.logger.info(f"下载进度: {progress:.1f}% ({total_downloaded}/{file_size})")
+                                    else:
+                                        self.logger.info(f"已下载: {total_downloaded} 字节")
+                    finally:
+                        if writer is not None:
+                            writer.close()
+                    _sync_and_release(f)
                 
                 # 下载完成后重命名文件
                 if file_size > 0 and total_downloaded == file_size:
-                    temp_file_path.rename(file_path)
+                    temp_file_path.replace(file_path)
                     self.logger.info(f"文件下载完成: {file_path}")
                     return True
                 elif file_size <= 0:
                     # 未知文件大小的情况下，假设下载完成
-                    temp_file_path.rename(file_path)
+                    temp_file_path.replace(file_path)
                     self.logger.info(f"文件下载完成: {file_path}")
                     return True
                 else:
@@ -564,8 +1061,7 @@ class BunkrDownloader:
                         else:
                             self.logger.warning(f"请求过多，重试中... ({attempt}/{max_retries-1})")
                         if attempt < max_retries - 1:
-                            delay = 3 ** (attempt + 1) + random.uniform(1, 3)
-                            time.sleep(delay)
+                            _host_backoff.penalize(url, _retry_delay(attempt, e.response.headers.get('Retry-After')))
                             continue
                     
                     if status_code == BunkrConfig.HTTP_STATUS_BAD_GATEWAY:
@@ -603,7 +1099,7 @@ class BunkrDownloader:
             安全的文件名
         """
         # 移除不安全字符
-        safe_filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+        safe_filename = _UNSAFE_FN_RE.sub('_', filename)
         
         # 限制长度
         if len(safe_filename) > BunkrConfig.MAX_FILENAME_LEN:
@@ -622,41 +1118,52 @@ class BunkrDownloader:
         Returns:
             (下载链接, 文件名) 元组
         """
+        api_task = None
         try:
-            # 获取页面内容
-            async with aiohttp.ClientSession(headers=BunkrConfig.HEADERS) as session:
+            page_info = _item_page_cache.get(item_url)
+            if page_info is None:
+                wait = _host_backoff.reserve(item_url)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                
+                # URL本身带有合法slug时（绝大多数情况），API请求与页面请求同时发出，
+                # 每个文件的等待时间由两次往返之和变为两者中的较大值
+                url_slug = _parse_url(item_url).tail
+                if _VALID_SLUG_RE.fullmatch(url_slug):
+                    api_task = asyncio.create_task(self.fetch_api_response_async(url_slug))
+                
+                # 获取页面内容
+                session = await self._get_aio_session()
                 async with session.get(item_url, timeout=15) as response:
                     if response.status != 200:
                         self.logger.error(f"获取页面失败: {item_url}")
                         return None, None
                     
-                    html_content = await response.text()
-                    soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # 获取API响应
-            api_response = self.get_api_response(item_url, soup)
-            if not api_response:
-                return None, None
-            
-            # 解密URL
-            download_link = self.decrypt_url(api_response)
-            if not download_link:
-                return None, None
-            
-            # 获取文件名
-            item_filename = self.get_item_filename(soup)
-            url_based_filename = self.get_url_based_filename(download_link) if download_link else None
+                    html_content = await response.read()
+                
+                # 页面解析是CPU密集操作，放到线程池中执行，不阻塞事件循环
+                page_info = await asyncio.get_running_loop().run_in_executor(
+                    None, self._parse_item_page, item_url, html_content
+                )
             
-            if url_based_filename:
-                formatted_filename = self.format_item_filename(item_filename, url_based_filename)
+            slug, item_filename = page_info
+            if api_task is not None and slug == url_slug:
+                api_response = await api_task
             else:
-                formatted_filename = item_filename
+                api_response = await self.fetch_api_response_async(slug)
             
-            return download_link, formatted_filename
+            download_info = self._build_download_info(api_response, item_filename)
+            if download_info[0]:
+                _item_page_cache.set(item_url, page_info)
+            return download_info
             
         except Exception as e:
             self.logger.error(f"异步获取下载信息失败: {e}")
             return None, None
+        finally:
+            # 页面请求失败或slug不一致时，不再需要预先发出的API请求
+            if api_task is not None and not api_task.done():
+                api_task.cancel()
     
     def get_download_info(self, item_url: str) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -669,38 +1176,80 @@ class BunkrDownloader:
             (下载链接, 文件名) 元组
         """
         try:
-            # 获取页面内容
-            response = self.session.get(item_url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 获取API响应
-            api_response = self.get_api_response(item_url, soup)
-            if not api_response:
-                return None, None
+            page_info = _item_page_cache.get(item_url)
+            if page_info is None:
+                wait = _host_backoff.reserve(item_url)
+                if wait > 0:
+                    time.sleep(wait)
+                
+                # 获取页面内容
+                response = self.session.get(item_url, timeout=15)
+                response.raise_for_status()
+                
+                page_info = self._parse_item_page(item_url, response.content)
             
-            # 解密URL
-            download_link = self.decrypt_url(api_response)
-            if not download_link:
-                return None, None
+            download_info = self._resolve_download_info(*page_info)
+            if download_info[0]:
+                _item_page_cache.set(item_url, page_info)
+            return download_info
             
-            # 获取文件名
-            item_filename = self.get_item_filename(soup)
-            url_based_filename = self.get_url_based_filename(download_link) if download_link else None
+        except Exception as e:
+            self.logger.error(f"获取下载信息失败: {e}")
+            return None, None
+    
+    def _parse_item_page(self, item_url: str, page_content: bytes) -> Tuple[str, str]:
+        """
+        解析文件页，提取媒体slug和页面上的文件名
+        
+        Args:
+            item_url: 项目URL
+            page_content: 原始页面内容
             
-            if url_based_filename:
-                formatted_filename = self.format_item_filename(item_filename, url_based_filename)
-            else:
-                formatted_filename = item_filename
+        Returns:
+            (slug, 文件名) 元组
+        """
+        soup = BeautifulSoup(page_content, HTML_PARSER, from_encoding='utf-8', parse_only=ITEM_PAGE_STRAINER)
+        return self.get_identifier(item_url, soup, page_content), self.get_item_filename(soup)
+    
+    def _resolve_download_info(self, slug: str, item_filename: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        根据文件页解析出的slug和文件名获取下载链接和最终文件名
+        
+        Args:
+            slug: 媒体slug
+            item_filename: 页面上的文件名
             
-            return download_link, formatted_filename
+        Returns:
+            (下载链接, 文件名) 元组，失败时为 (None, None)
+        """
+        return self._build_download_info(self.fetch_api_response(slug), item_filename)
+    
+    def _build_download_info(self, api_response: Optional[Dict[str, Any]], item_filename: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        由API响应和页面上的文件名得到下载链接和最终文件名
+        
+        Args:
+            api_response: API响应数据
+            item_filename: 页面上的文件名
             
-        except Exception as e:
-            self.logger.error(f"获取下载信息失败: {e}")
+        Returns:
+            (下载链接, 文件名) 元组，失败时为 (None, None)
+        """
+        if not api_response:
             return None, None
+        
+        # 解密URL
+        download_link = self.decrypt_url(api_response)
+        if not download_link:
+            return None, None
+        
+        # 获取文件名
+        url_based_filename = self.get_url_based_filename(download_link)
+        if url_based_filename:
+            return download_link, self.format_item_filename(item_filename, url_based_filename)
+        return download_link, item_filename
     
-    def download_from_url(self, url: str, ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None) -> Dict[str, Any]:
+    def download_from_url(self, url: str, ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None, concurrency: int = 4) -> Dict[str, Any]:
         """
         从bunkr URL下载文件（主入口方法）
         
@@ -708,6 +1257,7 @@ class BunkrDownloader:
             url: bunkr URL
             ignore_patterns: 忽略的文件名模式列表
             include_patterns: 包含的文件名模式列表
+            concurrency: 相册中同时下载的文件数
             
         Returns:
             下载结果字典
@@ -742,14 +1292,23 @@ class BunkrDownloader:
                     result['error'] = "未能从相册中提取到文件链接"
                     return result
                 
-                # 逐个下载文件
-                for file_link in file_links:
-                    try:
-                        file_result = self._download_single_file(
-                            file_link, 
-                            ignore_patterns, 
-                            include_patterns
-                        )
+                # 并发下载文件，同时进行的下载数不超过 concurrency
+                def download_one(file_link: str) -> Dict[str, Any]:
+                    # requests.Session 不保证线程安全，工作线程使用各自的会话
+                    worker = copy.copy(self)
+                    worker.session = _get_http_session() if self._default_session else _clone_session(self.session)
+                    return worker._download_single_file(file_link, ignore_patterns, include_patterns)
+                
+                with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="bunkr-album") as executor:
+                    futures = {executor.submit(download_one, file_link): file_link for file_link in file_links}
+                    for future in as_completed(futures):
+                        file_link = futures[future]
+                        try:
+                            file_result = future.result()
+                        except Exception as e:
+                            self.logger.error(f"处理文件链接时出错 {file_link}: {e}")
+                            result['files_failed'] += 1
+                            continue
                         
                         if file_result['success']:
                             result['files_downloaded'] += 1
@@ -760,13 +1319,6 @@ class BunkrDownloader:
                             result['files_failed'] += 1
                             result['failed_files'].append(file_result.get('filename', 'unknown'))
                             self.logger.warning(f"单个文件下载失败: {file_link}")
-                        
-                        # 添加延迟避免请求过快
-                        time.sleep(random.uniform(0.5, 2.0))
-                        
-                    except Exception as e:
-                        self.logger.error(f"处理文件链接时出错 {file_link}: {e}")
-                        result['files_failed'] += 1
                 
                 result['success'] = result['files_downloaded'] > 0
                 
@@ -810,21 +1362,47 @@ class BunkrDownloader:
         """
         # 检查忽略模式
         if ignore_patterns:
-            for pattern in ignore_patterns:
-                if pattern in filename:
-                    self.logger.info(f"文件 {filename} 匹配忽略模式 '{pattern}'，跳过下载")
-                    return True
+            pattern = _find_pattern(filename, ignore_patterns)
+            if pattern is not None:
+                self.logger.info(f"文件 {filename} 匹配忽略模式 '{pattern}'，跳过下载")
+                return True
         
         # 检查包含模式
         if include_patterns:
-            for pattern in include_patterns:
-                if pattern in filename:
-                    return False
+            if _find_pattern(filename, include_patterns) is not None:
+                return False
             self.logger.info(f"文件 {filename} 不匹配任何包含模式，跳过下载")
             return True
         
         return False
     
+    def _known_skip(self, file_url: str, ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None) -> Optional[str]:
+        """
+        不发任何请求判断文件能否直接跳过
+        
+        之前解析过该文件页时记住了最终文件名，文件已存在或被过滤模式排除时无需再获取下载信息
+        
+        Args:
+            file_url: 文件页面URL
+            ignore_patterns: 忽略模式列表
+            include_patterns: 包含模式列表
+            
+        Returns:
+            可以跳过时返回文件名，否则返回None
+        """
+        safe_filename = _resolved_filename_cache.get(file_url)
+        if safe_filename is None:
+            return None
+        
+        if (self.download_dir / safe_filename).exists():
+            self.logger.info(f"文件已存在，跳过下载: {safe_filename}")
+            return safe_filename
+        
+        if self._should_skip_file(safe_filename, ignore_patterns, include_patterns):
+            return safe_filename
+        
+        return None
+    
     def _download_single_file(self, file_url: str, ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         下载单个文件的内部方法
@@ -847,6 +1425,12 @@ class BunkrDownloader:
         }
         
         try:
+            skipped_filename = self._known_skip(file_url, ignore_patterns, include_patterns)
+            if skipped_filename is not None:
+                result['filename'] = skipped_filename
+                result['skipped'] = True
+                return result
+            
             # 获取下载信息
             download_link, filename = self.get_download_info(file_url)
             result['filename'] = filename
@@ -858,6 +1442,7 @@ class BunkrDownloader:
             # 清理文件名
             safe_filename = self._sanitize_filename(filename)
             file_path = self.download_dir / safe_filename
+            _resolved_filename_cache.set(file_url, safe_filename)
             
             # 检查文件是否已存在
             if file_path.exists():
@@ -884,7 +1469,7 @@ class BunkrDownloader:
             result['error'] = str(e)
             return result
     
-    async def download_from_url_async(self, url: str, ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None) -> Dict[str, Any]:
+    async def download_from_url_async(self, url: str, ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None, concurrency: int = 4) -> Dict[str, Any]:
         """
         异步版本的URL下载方法
         
@@ -892,6 +1477,7 @@ class BunkrDownloader:
             url: bunkr URL
             ignore_patterns: 忽略模式列表
             include_patterns: 包含模式列表
+            concurrency: 相册中同时下载的文件数
             
         Returns:
             下载结果字典
@@ -926,20 +1512,36 @@ class BunkrDownloader:
                     result['error'] = "未能从相册中提取到文件链接"
                     return result
                 
-                # 创建异步任务
-                tasks = []
+                # 之前解析过且可以直接跳过的文件不再获取下载信息
+                pending_links = []
                 for file_link in file_links:
-                    task = asyncio.create_task(
-                        self._download_single_file_async(file_link, ignore_patterns, include_patterns)
-                    )
-                    tasks.append(task)
+                    skipped_filename = self._known_skip(file_link, ignore_patterns, include_patterns)
+                    if skipped_filename is not None:
+                        result['skipped_files'].append(skipped_filename)
+                    else:
+                        pending_links.append(file_link)
                 
-                # 等待所有任务完成
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+                # 先并发获取全部文件的下载信息，再并发下载，同时进行的下载数不超过 concurrency
+                download_infos = await self._gather_download_infos(pending_links)
+                semaphore = asyncio.Semaphore(max(1, concurrency))
                 
-                for file_result in results:
-                    if isinstance(file_result, Exception):
-                        self.logger.error(f"异步下载任务失败: {file_result}")
+                async def download_one(file_link: str, download_info: Tuple[Optional[str], Optional[str]]) -> Dict[str, Any]:
+                    async with semaphore:
+                        return await self._download_single_file_async(file_link, ignore_patterns, include_patterns, download_info)
+                
+                tasks = []
+                for file_link, download_info in zip(pending_links, download_infos):
+                    if isinstance(download_info, Exception):
+                        self.logger.error(f"获取下载信息失败 {file_link}: {download_info}")
+                        download_info = (None, None)
+                    tasks.append(asyncio.create_task(download_one(file_link, download_info)))
+                
+                # 按完成顺序统计结果，完成一个记一个，不必等待最慢的文件
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        file_result = await next_done
+                    except Exception as e:
+                        self.logger.error(f"异步下载任务失败: {e}")
                         result['files_failed'] += 1
                         continue
                     
@@ -980,7 +1582,29 @@ class BunkrDownloader:
             result['error'] = str(e)
             return result
     
-    async def _download_single_file_async(self, file_url: str, ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None) -> Dict[str, Any]:
+    async def _gather_download_infos(self, urls: List[str], concurrency: int = 8) -> List[Union[Tuple[Optional[str], Optional[str]], BaseException]]:
+        """
+        并发获取多个文件的下载信息
+        
+        每个文件都需要一次页面请求和一次API请求，并发执行可将 N 次往返的等待时间
+        压缩到接近一次；同时进行的请求数不超过 concurrency
+        
+        Args:
+            urls: 文件页面URL列表
+            concurrency: 最大并发请求数
+            
+        Returns:
+            与urls顺序一致的 (下载链接, 文件名) 元组列表，获取失败的位置为异常对象
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def bounded(url: str) -> Tuple[Optional[str], Optional[str]]:
+            async with semaphore:
+                return await self.get_download_info_async(url)
+        
+        return await asyncio.gather(*(bounded(url) for url in urls), return_exceptions=True)
+    
+    async def _download_single_file_async(self, file_url: str, ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None, download_info: Optional[Tuple[Optional[str], Optional[str]]] = None) -> Dict[str, Any]:
         """
         异步版本的单个文件下载方法
         
@@ -988,6 +1612,7 @@ class BunkrDownloader:
             file_url: 文件页面URL
             ignore_patterns: 忽略模式列表
             include_patterns: 包含模式列表
+            download_info: 已获取的 (下载链接, 文件名)，为None时在此处获取
             
         Returns:
             下载结果字典
@@ -1002,8 +1627,16 @@ class BunkrDownloader:
         }
         
         try:
-            # 获取下载信息
-            download_link, filename = await self.get_download_info_async(file_url)
+            if download_info is None:
+                skipped_filename = self._known_skip(file_url, ignore_patterns, include_patterns)
+                if skipped_filename is not None:
+                    result['filename'] = skipped_filename
+                    result['skipped'] = True
+                    return result
+                
+                # 获取下载信息
+                download_info = await self.get_download_info_async(file_url)
+            download_link, filename = download_info
             result['filename'] = filename
             
             if not download_link or not filename:
@@ -1013,6 +1646,7 @@ class BunkrDownloader:
             # 清理文件名
             safe_filename = self._sanitize_filename(filename)
             file_path = self.download_dir / safe_filename
+            _resolved_filename_cache.set(file_url, safe_filename)
             
             # 检查文件是否已存在
             if file_path.exists():
@@ -1060,81 +1694,55 @@ class BunkrDownloader:
                         return False
                     continue
                 
+                # 按主机的请求节奏及退避期等待，不影响其他协程
+                wait = _host_backoff.reserve(url)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                
                 if attempt == 0:
                     self.logger.info(f"正在异步下载文件: {file_path.name}")
                 else:
                     self.logger.info(f"正在异步下载文件 (重试 {attempt}/{max_retries-1}): {file_path.name}")
                 
-                async with aiohttp.ClientSession(headers=BunkrConfig.DOWNLOAD_HEADERS) as session:
-                    async with session.get(url, timeout=30) as response:
-                        if response.status != 200:
-                            raise aiohttp.ClientResponseError(
-                                request_info=response.request_info,
-                                history=response.history,
-                                status=response.status
-                            )
-                        
-                        # 获取文件大小
-                        file_size = int(response.headers.get('Content-Length', -1))
-                        if file_size == -1:
-                            self.logger.warning("响应头中未提供Content-Length")
-                        
-                        # 创建临时文件
-                        temp_file_path = file_path.with_suffix('.temp')
-                        
-                        chunk_size = self.get_chunk_size(file_size)
-                        total_downloaded = 0
-                        
-                        with open(temp_file_path, 'wb') as f:
-                            async for chunk in response.content.iter_chunked(chunk_size):
-                                if chunk:
-                                    f.write(chunk)
-                                    total_downloaded += len(chunk)
-                                    
-                                    # 显示下载进度
-                                    if file_size > 0 and total_downloaded % (chunk_size * 100) == 0:
-                                        progress = (total_downloaded / file_size) * 100
-                                        self.logger.info(f"异步下载进度: {progress:.1f}% ({total_downloaded}/{file_size})")
-                        
-                        # 下载完成后重命名文件
-                        if file_size > 0 and total_downloaded == file_size:
-                            temp_file_path.rename(file_path)
-                            self.logger.info(f"异步文件下载完成: {file_path}")
-                            return True
-                        elif file_size <= 0:
-                            # 未知文件大小的情况下，假设下载完成
-                            temp_file_path.rename(file_path)
-                            self.logger.info(f"异步文件下载完成: {file_path}")
-                            return True
-                        else:
-                            # 下载不完整，保留.temp扩展名
-                            self.logger.warning(f"异步文件下载不完整: {file_path.name}")
-                            return False
-            
-            except aiohttp.ClientError as e:
-                if hasattr(e, 'status'):
-                    status_code = e.status
-                    
-                    if status_code == BunkrConfig.HTTP_STATUS_SERVER_DOWN:
-                        # 标记子域名为离线
-                        marked_subdomain = self.status_manager.mark_subdomain_as_offline(url)
-                        self.logger.warning(f"服务器无响应，已标记子域名 {marked_subdomain} 为离线")
-                        break
-                    
-                    if status_code in (429, 503):
-                        if attempt == 0:
-                            self.logger.warning(f"请求过多，准备重试...")
-                        else:
-                            self.logger.warning(f"请求过多，重试中... ({attempt}/{max_retries-1})")
-                        if attempt < max_retries - 1:
-                            delay = 3 ** (attempt + 1) + random.uniform(1, 3)
-                            await asyncio.sleep(delay)
-                            continue
-                    
-                    if status_code == BunkrConfig.HTTP_STATUS_BAD_GATEWAY:
-                        self.logger.error(f"服务器错误（Bad Gateway）: {file_path.name}")
-                        break
+                session = await self._get_aio_session()
+                async with session.get(url, headers=BunkrConfig.DOWNLOAD_HEADERS, timeout=30) as response:
+                    status_code = response.status
+                    if status_code == BunkrConfig.HTTP_STATUS_OK:
+                        return await self._write_response_async(response, file_path)
+                    retry_after = response.headers.get('Retry-After')
+                
+                # 非200状态直接按状态码分支处理
+                if status_code == BunkrConfig.HTTP_STATUS_SERVER_DOWN:
+                    # 标记子域名为离线
+                    marked_subdomain = self.status_manager.mark_subdomain_as_offline(url)
+                    self.logger.warning(f"服务器无响应，已标记子域名 {marked_subdomain} 为离线")
+                    break
+                
+                if status_code in (429, 503):
+                    if attempt == 0:
+                        self.logger.warning(f"请求过多，准备重试...")
+                    else:
+                        self.logger.warning(f"请求过多，重试中... ({attempt}/{max_retries-1})")
+                    if attempt < max_retries - 1:
+                        _host_backoff.penalize(url, _retry_delay(attempt, retry_after))
+                        continue
+                
+                if status_code == BunkrConfig.HTTP_STATUS_BAD_GATEWAY:
+                    self.logger.error(f"服务器错误（Bad Gateway）: {file_path.name}")
+                    break
+                
+                if attempt == 0:
+                    self.logger.error(f"异步下载请求失败: HTTP {status_code}")
+                else:
+                    self.logger.error(f"异步下载请求失败 (重试 {attempt}/{max_retries-1}): HTTP {status_code}")
                 
+                if attempt < max_retries - 1:
+                    delay = 2 ** attempt + random.uniform(1, 2)
+                    await asyncio.sleep(delay)
+                else:
+                    break
+        
+            except aiohttp.ClientError as e:
                 if attempt == 0:
                     self.logger.error(f"异步下载请求失败: {e}")
                 else:
@@ -1154,10 +1762,92 @@ class BunkrDownloader:
                     break
         
         return False
+    
+    async def _write_response_async(self, response: aiohttp.ClientResponse, file_path: Path) -> bool:
+        """
+        将状态为200的响应体写入文件
+        
+        Args:
+            response: aiohttp响应对象
+            file_path: 文件保存路径
+        
+        Returns:
+            True表示下载完整
+        """
+        # 获取文件大小
+        file_size = int(response.headers.get('Content-Length', -1))
+        if file_size == -1:
+            self.logger.warning("响应头中未提供Content-Length")
+        
+        # 创建临时文件
+        temp_file_path = self.get_temp_file_path(file_path)
+        
+        total_downloaded = 0
+        
+        # 网络侧直接取连接上已缓冲的数据（iter_any），写盘大小由下面的缓冲区控制。
+        # 写文件在线程池中执行，不阻塞事件循环；当前块写入的同时接收下一块，
+        # 提交下一块前等待上一块写完以保证写入顺序。
+        # 收到的块先攒起来，满 WRITE_BUFFER_SIZE 才用一次 writev 提交写入
+        loop = asyncio.get_running_loop()
+        pending_write = None
+        chunks: List[bytes] = []
+        buffered = 0
+        write_buffer_size = BunkrConfig.WRITE_BUFFER_SIZE
+        # 按时间间隔输出下载进度
+        monotonic = time.monotonic
+        last_log = monotonic()
+        with open(temp_file_path, 'wb') as f:
+            try:
+                async for chunk in response.content.iter_any():
+                    if chunk:
+                        chunks.append(chunk)
+                        buffered += len(chunk)
+                        total_downloaded += len(chunk)
+                        if buffered >= write_buffer_size or len(chunks) >= _WRITEV_MAX_BUFFERS:
+                            if pending_write is not None:
+                                await pending_write
+                            # 已提交的块列表交给写线程，之后换用新的列表
+                            pending_write = loop.run_in_executor(None, _write_chunks, f, chunks)
+                            chunks = []
+                            buffered = 0
+                        
+                        # 显示下载进度
+                        now = monotonic()
+                        if now - last_log >= BunkrConfig.PROGRESS_LOG_INTERVAL:
+                            last_log = now
+                            if file_size > 0:
+                                progress = (total_downloaded / file_size) * 100
+                                self.logger.info(f"异步下载进度: {progress:.1f}% ({total_downloaded}/{file_size})")
+                            else:
+                                self.logger.info(f"已异步下载: {total_downloaded} 字节")
+                
+                if chunks:
+                    if pending_write is not None:
+                        await pending_write
+                    pending_write = loop.run_in_executor(None, _write_chunks, f, chunks)
+            finally:
+                if pending_write is not None:
+                    await pending_write
+            await loop.run_in_executor(None, _sync_and_release, f)
+        
+        # 下载完成后重命名文件
+        if file_size > 0 and total_downloaded == file_size:
+            temp_file_path.replace(file_path)
+            self.logger.info(f"异步文件下载完成: {file_path}")
+            return True
+        elif file_size <= 0:
+            # 未知文件大小的情况下，假设下载完成
+            temp_file_path.replace(file_path)
+            self.logger.info(f"异步文件下载完成: {file_path}")
+            return True
+        else:
+            # 下载不完整，保留.temp扩展名
+            self.logger.warning(f"异步文件下载不完整: {file_path.name}")
+            return False
 
 
 # 便捷函数
-def download_from_bunkr(url: str, download_dir: str = "downloads", ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None, use_async: bool = False) -> Dict[str, Any]:
+def download_from_bunkr(url: str, download_dir: str = "downloads", ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None, use_async: bool = False, session: Optional[requests.Session] = None) -> Dict[str, Any]:
     """
     便捷函数：从bunkr URL下载文件
     
@@ -1167,19 +1857,33 @@ def download_from_bunkr(url: str, download_dir: str = "downloads", ignore_patter
         ignore_patterns: 忽略的文件名模式列表
         include_patterns: 包含的文件名模式列表
         use_async: 是否使用异步下载
+        session: 可选的requests session，默认使用当前线程共享的会话
         
     Returns:
         下载结果字典
     """
-    downloader = BunkrDownloader(download_dir=download_dir)
-    
     if use_async:
-        return asyncio.run(downloader.download_from_url_async(url, ignore_patterns, include_patterns))
-    else:
-        return downloader.download_from_url(url, ignore_patterns, include_patterns)
+        def run_async() -> Dict[str, Any]:
+            return asyncio.run(
+                download_from_bunkr_async(url, download_dir, ignore_patterns, include_patterns, session=session),
+                loop_factory=_EVENT_LOOP_FACTORY
+            )
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return run_async()
+        
+        # 当前线程已有运行中的事件循环时 asyncio.run 会报错，改在独立线程的新事件循环中执行；
+        # 协程中的调用方应直接使用 download_from_bunkr_async
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="bunkr-async") as executor:
+            return executor.submit(run_async).result()
+    
+    downloader = BunkrDownloader(download_dir=download_dir, session=session or _get_http_session())
+    return downloader.download_from_url(url, ignore_patterns, include_patterns)
 
 
-async def download_from_bunkr_async(url: str, download_dir: str = "downloads", ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None) -> Dict[str, Any]:
+async def download_from_bunkr_async(url: str, download_dir: str = "downloads", ignore_patterns: Optional[List[str]] = None, include_patterns: Optional[List[str]] = None, session: Optional[requests.Session] = None) -> Dict[str, Any]:
     """
     异步便捷函数：从bunkr URL下载文件
     
@@ -1188,11 +1892,12 @@ async def download_from_bunkr_async(url: str, download_dir: str = "downloads", i
         download_dir: 下载目录
         ignore_patterns: 忽略的文件名模式列表
         include_patterns: 包含的文件名模式列表
+        session: 可选的requests session（用于同步解析相册页），默认使用当前线程共享的会话
         
     Returns:
         下载结果字典
     """
-    downloader = BunkrDownloader(download_dir=download_dir)
-    return await downloader.download_from_url_async(url, ignore_patterns, include_patterns)
+    async with BunkrDownloader(download_dir=download_dir, session=session or _get_http_session()) as downloader:
+        return await downloader.download_from_url_async(url, ignore_patterns, include_patterns)
 
 
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup, Tag
 import time
 import random
@@ -24,14 +25,49 @@ import uuid
 import copy
 
 from urllib.parse import urljoin
-from typing import Dict, Any, Optional, List, Union
+from typing import Callable, Dict, Any, Optional, List, Union
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 
-from db.postgre import PostgreSQLManager
+from db.postgre import PostgreSQLManager, get_shared_manager
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# 每个工作线程复用一个HTTP会话，跨爬取/同步任务保持与论坛的keep-alive连接
+_http_local = threading.local()
+
+def _get_http_session(cookies: Optional[dict] = None) -> requests.Session:
+    """
+    获取当前线程共享的requests会话
+    
+    requests.Session 不保证线程安全，因此按线程缓存；爬取任务运行在固定的线程池中，
+    同一线程上的后续任务可以直接复用已建立的TCP/TLS连接。
+    复用的只是连接：每次获取时cookie都会被替换为本次任务的cookies，
+    上一个任务（或其他配置文件）的登录凭据不会带到后续任务中
+    
+    Args:
+        cookies: 本次任务使用的cookies，为None时不携带任何cookie
+    
+    Returns:
+        当前线程的requests.Session对象
+    """
+    session = getattr(_http_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_local.session = session
+    session.cookies.clear()
+    if cookies:
+        session.cookies.update(cookies)
+    return session
 
 
 def scrape_post_reactions(post_id: int, base_url: str, session: Optional[requests.Session] = None) -> int:
@@ -47,7 +83,7 @@ def scrape_post_reactions(post_id: int, base_url: str, session: Optional[request
         reactions总数
     """
     if session is None:
-        session = requests.Session()
+        session = _get_http_session()
     
     reactions_url = urljoin(base_url, f'posts/{post_id}/reactions')
     
@@ -311,12 +347,7 @@ def scrape_xenforo_thread_with_requests(start_url: str, cookies: dict, enable_re
              - 'floor': 楼层号 (int | str | None)
     """
     base_url = urljoin(start_url, '/')
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    session = requests.Session()
-    session.headers.update(headers)
-    session.cookies.update(cookies)
+    session = _get_http_session(cookies)
     
     all_posts: List[Dict[str, Any]] = []
     total_posts_count = 0
@@ -426,9 +457,7 @@ def save_posts_to_database(posts: List[Dict[str, Any]], thread_title: str, threa
                 uuid, thread_uuid, post_id, author_name, author_id, 
                 author_profile_url, post_timestamp, content_text, content_html,
                 image_urls, external_links, iframe_urls, floor
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-            )
+            ) VALUES %s
         """
         
         insert_data = []
@@ -585,9 +614,7 @@ def _save_reactions_to_database(post_uuids: List[tuple], db_manager: PostgreSQLM
         insert_query = """
             INSERT INTO simpcity_thread_reactions (
                 uuid, post_uuid, reactions, create_time, update_time
-            ) VALUES (
-                %s, %s, %s, NOW(), NOW()
-            )
+            ) VALUES %s
         """
         
         insert_data = []
@@ -598,7 +625,7 @@ def _save_reactions_to_database(post_uuids: List[tuple], db_manager: PostgreSQLM
                 insert_data.append((reaction_uuid, post_uuid, reactions_count))
         
         if insert_data:
-            affected_rows = db_manager.execute_many(insert_query, insert_data)
+            affected_rows = db_manager.execute_many(insert_query, insert_data, template="(%s, %s, %s, NOW(), NOW())")
             return affected_rows
         
         return 0
@@ -628,13 +655,7 @@ def extract_thread_metadata(thread_url: str, cookies: dict) -> Dict[str, Any]:
     }
     
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
-        session = requests.Session()
-        session.headers.update(headers)
-        session.cookies.update(cookies)
+        session = _get_http_session(cookies)
         
         response = session.get(thread_url, timeout=10)
         response.raise_for_status()
@@ -795,13 +816,11 @@ def crawler(thread_url: str, cookies: dict, thread_title: Optional[str] = None,
         # 如果启用数据库存储
         if save_to_db:
             print("正在保存数据到数据库...")
-            db_manager = PostgreSQLManager(config_path)
-            try:
-                db_records = save_posts_to_database(posts, thread_title, thread_url, db_manager, cookies)
-                result['db_records'] = db_records
-                print(f"数据库操作完成，保存了 {db_records} 条记录")
-            finally:
-                db_manager.close_all_connections()
+            # 使用进程内共享的连接池，不在每次爬取后关闭
+            db_manager = get_shared_manager(config_path)
+            db_records = save_posts_to_database(posts, thread_title, thread_url, db_manager, cookies)
+            result['db_records'] = db_records
+            print(f"数据库操作完成，保存了 {db_records} 条记录")
         
         return result
         
@@ -884,105 +903,102 @@ def sync(thread_url: str, cookies: dict, thread_title: Optional[str] = None,
             return result
         
         # 2. 从数据库中查询现有数据
-        db_manager = PostgreSQLManager(config_path)
-        try:
-            # 首先获取线程UUID
-            thread_check_query = """
-                SELECT uuid FROM simpcity_thread_metadata 
-                WHERE url = %s AND is_deleted = false
-            """
-            thread_result = db_manager.execute_one(thread_check_query, (thread_url,))
-            
-            if not thread_result:
-                # 线程不存在，所有帖子都是新的
-                result['new_posts'] = len(new_posts)
-                result['total_posts'] = len(new_posts)
-                result['success'] = True
-                
-                if save_to_db:
-                    db_records = _save_posts_to_database_sync(new_posts, thread_title, thread_url, db_manager, cookies)
-                    result['db_records'] = db_records
-                
-                return result
-            
-            thread_uuid = str(thread_result['uuid'])
-            
-            # 根据thread_uuid查询现有数据
-            existing_query = """
-                SELECT post_id, author_name, author_id, floor, content_text, content_html,
-                       image_urls, external_links, iframe_urls, post_timestamp, author_profile_url
-                FROM simpcity_thread_response 
-                WHERE thread_uuid = %s AND is_deleted = false
-                ORDER BY floor ASC
-            """
-            existing_posts = db_manager.execute_query(existing_query, (thread_uuid,))
-            
-            # 将现有数据转换为以floor为key的字典，方便查找
-            existing_posts_dict = {}
-            for post in existing_posts:
-                floor_key = post['floor']
-                if floor_key is not None:
-                    existing_posts_dict[floor_key] = post
-            
-            # 3. 对比新旧数据
-            print("正在对比数据差异...")
-            
-            # 新爬取的数据转换为以floor为key的字典
-            new_posts_dict = {}
-            for post in new_posts:
-                floor_key = post.get('floor')
-                if floor_key is not None:
-                    new_posts_dict[floor_key] = post
-            
-            # 找出新增、修改、未变化的帖子
-            new_post_list = []
-            updated_post_list = []
-            unchanged_count = 0
-            
-            for floor, new_post in new_posts_dict.items():
-                if floor not in existing_posts_dict:
-                    # 新增帖子
-                    new_post_list.append(new_post)
-                else:
-                    # 检查是否有修改
-                    existing_post = existing_posts_dict[floor]
-                    if _is_post_changed(new_post, existing_post):
-                        updated_post_list.append(new_post)
-                    else:
-                        unchanged_count += 1
-            
-            # 找出已删除的帖子（在原数据中存在但在新数据中不存在）
-            deleted_floors = set(existing_posts_dict.keys()) - set(new_posts_dict.keys())
-            
-            # 4. 执行数据库操作
-            print(f"发现变化：新增{len(new_post_list)}个，更新{len(updated_post_list)}个，删除{len(deleted_floors)}个，未变化{unchanged_count}个")
-            
-            # 插入新增的帖子
-            if new_post_list:
-                new_records = _save_posts_to_database_sync(new_post_list, thread_title, thread_url, db_manager, cookies)
-                result['new_posts'] = new_records
-                print(f"新增了 {new_records} 条记录")
-            
-            # 更新修改的帖子
-            if updated_post_list:
-                updated_records = _update_posts_in_database(updated_post_list, thread_title, thread_url, db_manager, cookies)
-                result['updated_posts'] = updated_records
-                print(f"更新了 {updated_records} 条记录")
-            
-            # 标记删除的帖子
-            if deleted_floors:
-                deleted_records = _mark_posts_as_deleted(deleted_floors, thread_url, thread_title, db_manager, cookies)
-                result['deleted_posts'] = deleted_records
-                print(f"标记删除了 {deleted_records} 条记录")
-            
-            result['unchanged_posts'] = unchanged_count
-            result['db_records'] = result['new_posts'] + result['updated_posts'] + result['deleted_posts']
+        # 使用进程内共享的连接池，不在每次同步后关闭
+        db_manager = get_shared_manager(config_path)
+        # 首先获取线程UUID
+        thread_check_query = """
+            SELECT uuid FROM simpcity_thread_metadata 
+            WHERE url = %s AND is_deleted = false
+        """
+        thread_result = db_manager.execute_one(thread_check_query, (thread_url,))
+        
+        if not thread_result:
+            # 线程不存在，所有帖子都是新的
+            result['new_posts'] = len(new_posts)
+            result['total_posts'] = len(new_posts)
             result['success'] = True
             
-            print(f"同步完成：新增{result['new_posts']}，更新{result['updated_posts']}，删除{result['deleted_posts']}，未变化{result['unchanged_posts']}")
+            if save_to_db:
+                db_records = _save_posts_to_database_sync(new_posts, thread_title, thread_url, db_manager, cookies)
+                result['db_records'] = db_records
             
-        finally:
-            db_manager.close_all_connections()
+            return result
+        
+        thread_uuid = str(thread_result['uuid'])
+        
+        # 根据thread_uuid查询现有数据
+        existing_query = """
+            SELECT post_id, author_name, author_id, floor, content_text, content_html,
+                   image_urls, external_links, iframe_urls, post_timestamp, author_profile_url
+            FROM simpcity_thread_response 
+            WHERE thread_uuid = %s AND is_deleted = false
+            ORDER BY floor ASC
+        """
+        existing_posts = db_manager.execute_query(existing_query, (thread_uuid,))
+        
+        # 将现有数据转换为以floor为key的字典，方便查找
+        existing_posts_dict = {}
+        for post in existing_posts:
+            floor_key = post['floor']
+            if floor_key is not None:
+                existing_posts_dict[floor_key] = post
+        
+        # 3. 对比新旧数据
+        print("正在对比数据差异...")
+        
+        # 新爬取的数据转换为以floor为key的字典
+        new_posts_dict = {}
+        for post in new_posts:
+            floor_key = post.get('floor')
+            if floor_key is not None:
+                new_posts_dict[floor_key] = post
+        
+        # 找出新增、修改、未变化的帖子
+        new_post_list = []
+        updated_post_list = []
+        unchanged_count = 0
+        
+        for floor, new_post in new_posts_dict.items():
+            if floor not in existing_posts_dict:
+                # 新增帖子
+                new_post_list.append(new_post)
+            else:
+                # 检查是否有修改
+                existing_post = existing_posts_dict[floor]
+                if _is_post_changed(new_post, existing_post):
+                    updated_post_list.append(new_post)
+                else:
+                    unchanged_count += 1
+        
+        # 找出已删除的帖子（在原数据中存在但在新数据中不存在）
+        deleted_floors = set(existing_posts_dict.keys()) - set(new_posts_dict.keys())
+        
+        # 4. 执行数据库操作
+        print(f"发现变化：新增{len(new_post_list)}个，更新{len(updated_post_list)}个，删除{len(deleted_floors)}个，未变化{unchanged_count}个")
+        
+        # 插入新增的帖子
+        if new_post_list:
+            new_records = _save_posts_to_database_sync(new_post_list, thread_title, thread_url, db_manager, cookies)
+            result['new_posts'] = new_records
+            print(f"新增了 {new_records} 条记录")
+        
+        # 更新修改的帖子
+        if updated_post_list:
+            updated_records = _update_posts_in_database(updated_post_list, thread_title, thread_url, db_manager, cookies)
+            result['updated_posts'] = updated_records
+            print(f"更新了 {updated_records} 条记录")
+        
+        # 标记删除的帖子
+        if deleted_floors:
+            deleted_records = _mark_posts_as_deleted(deleted_floors, thread_url, thread_title, db_manager, cookies)
+            result['deleted_posts'] = deleted_records
+            print(f"标记删除了 {deleted_records} 条记录")
+        
+        result['unchanged_posts'] = unchanged_count
+        result['db_records'] = result['new_posts'] + result['updated_posts'] + result['deleted_posts']
+        result['success'] = True
+        
+        print(f"同步完成：新增{result['new_posts']}，更新{result['updated_posts']}，删除{result['deleted_posts']}，未变化{result['unchanged_posts']}")
         
         return result
         
@@ -999,7 +1015,8 @@ def watch(thread_url: str, cookies: dict,
           thread_title: Optional[str] = None,
           enable_reactions: bool = True,
           save_to_db: bool = True,
-          config_path: str = "config.yaml") -> Dict[str, Any]:
+          config_path: str = "config.yaml",
+          on_sync: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
     """
     监控simpcity帖子，定时执行同步操作
     
@@ -1013,6 +1030,7 @@ def watch(thread_url: str, cookies: dict,
         enable_reactions: 是否启用reactions抓取，默认True
         save_to_db: 是否保存到数据库，默认True
         config_path: 数据库配置文件路径
+        on_sync: 每次同步结束后调用的回调，参数为最新的状态快照（与status()返回值相同）
     
     Returns:
         包含监控器信息的字典，包含启动/停止方法
@@ -1096,6 +1114,12 @@ def watch(thread_url: str, cookies: dict,
                 'success': False,
                 'error': str(e)
             }
+        
+        if on_sync is not None:
+            try:
+                on_sync(get_status())
+            except Exception as e:
+                logger.error(f"同步回调执行失败: {str(e)}")
     
     def job_listener(event):
         """作业事件监听器"""
@@ -1272,9 +1296,7 @@ def _save_posts_to_database_sync(posts: List[Dict[str, Any]], thread_title: str,
                 uuid, thread_uuid, post_id, author_name, author_id, 
                 author_profile_url, post_timestamp, content_text, content_html,
                 image_urls, external_links, iframe_urls, floor
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-            )
+            ) VALUES %s
         """
         
         insert_data = []
@@ -1340,17 +1362,20 @@ def _update_posts_in_database(posts: List[Dict[str, Any]], thread_title: str,
         # 1. 确保线程存在
         thread_uuid = _ensure_thread_exists(thread_title, thread_url, db_manager, cookies)
         
-        # 2. 更新帖子数据
+        # 2. 用一条语句更新全部修改的帖子，统计触发器只触发一次
+        # 各行按表的行类型从JSON展开，列类型与表定义一致
         update_query = """
-            UPDATE simpcity_thread_response SET
-                post_id = %s, author_name = %s, author_id = %s, 
-                author_profile_url = %s, post_timestamp = %s, 
-                content_text = %s, content_html = %s, image_urls = %s, 
-                external_links = %s, iframe_urls = %s, update_time = NOW()
-            WHERE thread_uuid = %s AND floor = %s
+            UPDATE simpcity_thread_response tr SET
+                post_id = v.post_id, author_name = v.author_name, author_id = v.author_id, 
+                author_profile_url = v.author_profile_url, post_timestamp = v.post_timestamp, 
+                content_text = v.content_text, content_html = v.content_html, image_urls = v.image_urls, 
+                external_links = v.external_links, iframe_urls = v.iframe_urls, update_time = NOW()
+            FROM jsonb_populate_recordset(NULL::simpcity_thread_response, %s::jsonb) AS v
+            WHERE tr.thread_uuid = v.thread_uuid AND tr.floor = v.floor
         """
         
-        updated_count = 0
+        # 按楼层去重，同一楼层以后出现的为准；没有楼层号的帖子无法定位，不参与更新
+        rows_by_floor: Dict[int, Dict[str, Any]] = {}
         
         for post in posts:
             # 处理floor字段
@@ -1360,30 +1385,31 @@ def _update_posts_in_database(posts: List[Dict[str, Any]], thread_title: str,
                     floor_value = int(floor_value)
                 elif not isinstance(floor_value, int):
                     floor_value = None
+            if floor_value is None:
+                continue
             
-            # 将列表转换为JSON字符串
-            image_urls_json = json.dumps(post.get('image_urls', []))
-            external_links_json = json.dumps(post.get('external_links', []))
-            iframe_urls_json = json.dumps(post.get('iframe_urls', []))
-            
-            row_data = (
-                str(post.get('post_id')) if post.get('post_id') is not None else None,  # post_id
-                post.get('author_name'),                  # author_name
-                str(post.get('author_id')) if post.get('author_id') is not None else None,  # author_id
-                post.get('author_profile_url'),           # author_profile_url
-                post.get('post_timestamp'),               # post_timestamp
-                post.get('content_text'),                 # content_text
-                post.get('content_html'),                 # content_html
-                image_urls_json,                          # image_urls
-                external_links_json,                      # external_links
-                iframe_urls_json,                         # iframe_urls
-                thread_uuid,                              # thread_uuid
-                floor_value                               # floor
-            )
-            
-            updated_count += db_manager.execute_update(update_query, row_data)
-            
-            # 3. 更新反应数据
+            rows_by_floor[floor_value] = {
+                'post_id': str(post.get('post_id')) if post.get('post_id') is not None else None,
+                'author_name': post.get('author_name'),
+                'author_id': str(post.get('author_id')) if post.get('author_id') is not None else None,
+                'author_profile_url': post.get('author_profile_url'),
+                'post_timestamp': post.get('post_timestamp'),
+                'content_text': post.get('content_text'),
+                'content_html': post.get('content_html'),
+                'image_urls': post.get('image_urls', []),
+                'external_links': post.get('external_links', []),
+                'iframe_urls': post.get('iframe_urls', []),
+                'thread_uuid': thread_uuid,
+                'floor': floor_value
+            }
+        
+        if not rows_by_floor:
+            return 0
+        
+        updated_count = db_manager.execute_update(update_query, (json.dumps(list(rows_by_floor.values())),))
+        
+        # 3. 更新反应数据
+        for post in posts:
             _update_reactions_in_database(post, thread_uuid, db_manager)
         
         return updated_count
@@ -0,0 +1,5 @@
+-- 帖子按楼层分页的复合索引
+-- 支撑 get_thread_posts / get_thread_posts_by_id 的键集分页：
+--   WHERE thread_uuid = ? AND is_deleted = false AND floor > ? ORDER BY floor LIMIT ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_thread_response_thread_deleted_floor
+    ON simpcity_thread_response (thread_uuid, is_deleted, floor);
@@ -0,0 +1,82 @@
+-- simpcity_thread_metadata 反规范化统计列
+-- 线程列表不再需要对 simpcity_thread_response 做 JOIN + GROUP BY，
+-- 统计值由 simpcity_thread_response 上的语句级触发器维护
+-- 触发器每条语句对受影响的线程整体重算一次，写入方应以单条多行语句批量写入
+-- （见 PostgreSQLManager.execute_many），逐行执行的语句会逐行重算
+
+ALTER TABLE simpcity_thread_metadata
+    ADD COLUMN IF NOT EXISTS posts_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS authors_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS latest_post_timestamp BIGINT,
+    ADD COLUMN IF NOT EXISTS first_post_timestamp BIGINT;
+
+-- 重新计算指定线程的统计值（参数为 thread_uuid 数组）
+CREATE OR REPLACE FUNCTION simpcity_refresh_thread_stats(thread_uuids anyarray)
+RETURNS void AS $$
+    UPDATE simpcity_thread_metadata tm
+    SET posts_count = s.posts_count,
+        authors_count = s.authors_count,
+        latest_post_timestamp = s.latest_post_timestamp,
+        first_post_timestamp = s.first_post_timestamp
+    FROM (
+        SELECT
+            t.thread_uuid,
+            COUNT(tr.id) AS posts_count,
+            COUNT(DISTINCT tr.author_id) AS authors_count,
+            MAX(tr.post_timestamp) AS latest_post_timestamp,
+            MIN(tr.post_timestamp) AS first_post_timestamp
+        FROM unnest(thread_uuids) AS t(thread_uuid)
+        LEFT JOIN simpcity_thread_response tr ON tr.thread_uuid = t.thread_uuid
+            AND tr.is_deleted = false
+        GROUP BY t.thread_uuid
+    ) s
+    WHERE tm.uuid = s.thread_uuid;
+$$ LANGUAGE sql;
+
+-- 触发器函数：每条语句只对受影响的线程重算一次
+CREATE OR REPLACE FUNCTION simpcity_thread_response_stats_trigger()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM simpcity_refresh_thread_stats(ARRAY(
+            SELECT DISTINCT thread_uuid FROM new_rows
+        ));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM simpcity_refresh_thread_stats(ARRAY(
+            SELECT thread_uuid FROM new_rows
+            UNION
+            SELECT thread_uuid FROM old_rows
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM simpcity_refresh_thread_stats(ARRAY(
+            SELECT DISTINCT thread_uuid FROM old_rows
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_thread_response_stats_insert ON simpcity_thread_response;
+CREATE TRIGGER trg_thread_response_stats_insert
+    AFTER INSERT ON simpcity_thread_response
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION simpcity_thread_response_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_thread_response_stats_update ON simpcity_thread_response;
+CREATE TRIGGER trg_thread_response_stats_update
+    AFTER UPDATE ON simpcity_thread_response
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION simpcity_thread_response_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_thread_response_stats_delete ON simpcity_thread_response;
+CREATE TRIGGER trg_thread_response_stats_delete
+    AFTER DELETE ON simpcity_thread_response
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION simpcity_thread_response_stats_trigger();
+
+-- 回填已有线程的统计值
+SELECT simpcity_refresh_thread_stats(ARRAY(SELECT uuid FROM simpcity_thread_metadata));
+
+-- 线程列表按最新回复时间排序
+CREATE INDEX IF NOT EXISTS idx_thread_metadata_deleted_latest
+    ON simpcity_thread_metadata (is_deleted, latest_post_timestamp DESC NULLS LAST);
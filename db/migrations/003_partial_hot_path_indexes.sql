@@ -0,0 +1,20 @@
+-- 热点查询的部分索引（仅索引未删除的行，体积更小）
+-- 所有读路径都带 is_deleted = false 条件，部分索引可完全替代 001 中的全量复合索引
+
+-- 帖子按楼层分页：WHERE thread_uuid = ? AND floor > ? ORDER BY floor LIMIT ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tr_thread_floor
+    ON simpcity_thread_response (thread_uuid, floor)
+    WHERE is_deleted = false;
+
+-- 统计刷新函数 simpcity_refresh_thread_stats 中的 MAX/MIN(post_timestamp)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tr_thread_ts
+    ON simpcity_thread_response (thread_uuid, post_timestamp DESC)
+    WHERE is_deleted = false;
+
+-- get_thread_posts / get_thread_info 的 WHERE tm.url = ? 查询
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tm_url
+    ON simpcity_thread_metadata (url)
+    WHERE is_deleted = false;
+
+-- 已被 idx_tr_thread_floor 覆盖
+DROP INDEX CONCURRENTLY IF EXISTS idx_thread_response_thread_deleted_floor;
@@ -0,0 +1,9 @@
+-- 线程列表键集分页的部分索引
+-- get_threads_list: WHERE is_deleted = false AND (COALESCE(latest_post_timestamp, -1), id) < (?, ?)
+--                   ORDER BY COALESCE(latest_post_timestamp, -1) DESC, id DESC LIMIT ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tm_list_keyset
+    ON simpcity_thread_metadata ((COALESCE(latest_post_timestamp, -1)) DESC, id DESC)
+    WHERE is_deleted = false;
+
+-- 已被 idx_tm_list_keyset 覆盖
+DROP INDEX CONCURRENTLY IF EXISTS idx_thread_metadata_deleted_latest;
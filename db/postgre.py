@@ -1,14 +1,30 @@
 import psycopg2
+import psycopg2.extensions
 import psycopg2.pool
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values, register_default_json, register_default_jsonb
 from typing import Optional, Dict, Any, List, Tuple
 import logging
 from contextlib import contextmanager
 import os
 import sys
+import threading
+
+import orjson
 
 from config.config import get_config
 
+# json/jsonb 列统一由 orjson 解析为 Python 对象，对所有连接生效
+register_default_json(globally=True, loads=orjson.loads)
+register_default_jsonb(globally=True, loads=orjson.loads)
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """记录已在本会话中PREPARE过的语句名的连接类型"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
 
 class PostgreSQLManager:
     """PostgreSQL数据库连接管理器"""
@@ -22,6 +38,7 @@ class PostgreSQLManager:
         """
         self.config = get_config(config_path)
         self.connection_pool = None
+        self._pool_lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
         self._setup_logging()
         
@@ -52,8 +69,8 @@ class PostgreSQLManager:
                 'database': os.getenv('DB_NAME', 'dionysus'),
                 'user': os.getenv('DB_USER', 'postgres'),
                 'password': os.getenv('DB_PASSWORD', 'password'),
-                'min_connections': int(os.getenv('DB_MIN_CONNECTIONS', '1')),
-                'max_connections': int(os.getenv('DB_MAX_CONNECTIONS', '20'))
+                'min_connections': int(os.getenv('DB_MIN_CONNECTIONS', '5')),
+                'max_connections': int(os.getenv('DB_MAX_CONNECTIONS', '25'))
             }
         
         return db_config
@@ -65,23 +82,25 @@ class PostgreSQLManager:
         Returns:
             连接池对象
         """
-        if self.connection_pool is None:
-            db_config = self._get_db_config()
-            
-            try:
-                self.connection_pool = psycopg2.pool.ThreadedConnectionPool(
-                    minconn=db_config.get('min_connections', 1),
-                    maxconn=db_config.get('max_connections', 20),
-                    host=db_config['host'],
-                    port=db_config['port'],
-                    database=db_config['database'],
-                    user=db_config['user'],
-                    password=db_config['password']
-                )
-                self.logger.info("数据库连接池创建成功")
-            except Exception as e:
-                self.logger.error(f"创建数据库连接池失败: {e}")
-                raise
+        with self._pool_lock:
+            if self.connection_pool is None:
+                db_config = self._get_db_config()
+                
+                try:
+                    self.connection_pool = psycopg2.pool.ThreadedConnectionPool(
+                        minconn=db_config.get('min_connections', 5),
+                        maxconn=db_config.get('max_connections', 25),
+                        host=db_config['host'],
+                        port=db_config['port'],
+                        database=db_config['database'],
+                        user=db_config['user'],
+                        password=db_config['password'],
+                        connection_factory=PreparingConnection
+                    )
+                    self.logger.info("数据库连接池创建成功")
+                except Exception as e:
+                    self.logger.error(f"创建数据库连接池失败: {e}")
+                    raise
         
         return self.connection_pool
     
@@ -165,6 +184,52 @@ class PostgreSQLManager:
             cursor.execute(query, params)
             return cursor.fetchone()
     
+    def execute_prepared(
+        self,
+        name: str,
+        param_types: Tuple[str, ...],
+        query: str,
+        params: Tuple,
+        fetch_one: bool = False
+    ) -> Any:
+        """
+        以服务端预备语句执行查询
+        
+        每个连接首次遇到该语句名时执行一次 PREPARE，之后同一连接上只发送 EXECUTE，
+        省去服务端重复的解析与规划
+        
+        Args:
+            name: 预备语句名（需在全局唯一，修改SQL时应同时修改版本后缀）
+            param_types: 参数的PostgreSQL类型，如 ("int", "int")；写 "unknown" 时由服务端按上下文推断
+            query: 使用 $1, $2 ... 占位符的SQL语句
+            params: 查询参数
+            fetch_one: 为True时只返回单条结果
+            
+        Returns:
+            查询结果列表，fetch_one为True时返回单条结果或None
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                prepared = getattr(conn, 'prepared_statements', None)
+                if prepared is None or name not in prepared:
+                    cursor.execute(f"PREPARE {name} ({', '.join(param_types)}) AS {query}")
+                    if prepared is not None:
+                        prepared.add(name)
+                placeholders = ', '.join(['%s'] * len(params))
+                cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+                result = cursor.fetchone() if fetch_one else cursor.fetchall()
+                if prepared is None:
+                    cursor.execute(f"DEALLOCATE {name}")
+                conn.commit()
+                return result
+            except Exception as e:
+                conn.rollback()
+                self.logger.error(f"数据库操作错误: {e}")
+                raise
+            finally:
+                cursor.close()
+    
     def execute_insert(self, query: str, params: Optional[Tuple] = None) -> Optional[int]:
         """
         执行插入语句
@@ -213,27 +278,35 @@ class PostgreSQLManager:
             cursor.execute(query, params)
             return cursor.rowcount
     
-    def execute_many(self, query: str, params_list: List[Tuple]) -> int:
+    def execute_many(self, query: str, params_list: List[Tuple], template: Optional[str] = None) -> int:
         """
-        批量执行语句
+        以单条多行语句批量执行
+        
+        全部参数展开到同一条语句的 VALUES 中，服务端只解析执行一次，
+        语句级触发器也只触发一次（executemany 会逐行发送语句）
         
         Args:
-            query: SQL语句
+            query: 含单个 VALUES %s 占位符的SQL语句
             params_list: 参数列表
+            template: 每行的模板，如 "(%s, %s, NOW())"，默认每个参数一个 %s
             
         Returns:
             受影响的行数
         """
+        if not params_list:
+            return 0
+        
         with self.get_cursor() as cursor:
-            cursor.executemany(query, params_list)
+            execute_values(cursor, query, params_list, template=template, page_size=len(params_list))
             return cursor.rowcount
     
     def close_all_connections(self):
         """关闭所有连接"""
-        if self.connection_pool:
-            self.connection_pool.closeall()
-            self.connection_pool = None
-            self.logger.info("所有数据库连接已关闭")
+        with self._pool_lock:
+            if self.connection_pool:
+                self.connection_pool.closeall()
+                self.connection_pool = None
+                self.logger.info("所有数据库连接已关闭")
     
     def __enter__(self):
         """上下文管理器入口"""
@@ -242,3 +315,38 @@ class PostgreSQLManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """上下文管理器出口"""
         self.close_all_connections()
+
+
+# 进程内共享的数据库管理器，按配置文件路径缓存
+_shared_managers: Dict[str, PostgreSQLManager] = {}
+_shared_managers_lock = threading.Lock()
+
+def get_shared_manager(config_path: str = "config.yaml") -> PostgreSQLManager:
+    """
+    获取进程内共享的数据库管理器
+    
+    同一配置文件只创建一次连接池，调用方从池中借用连接并在结束后归还，
+    避免每次请求或每次爬取都重新读取配置并建立数据库连接。
+    共享的管理器不应由调用方关闭，进程退出前统一调用 close_shared_managers()
+    
+    Args:
+        config_path: 配置文件路径
+        
+    Returns:
+        共享的PostgreSQLManager实例
+    """
+    manager = _shared_managers.get(config_path)
+    if manager is None:
+        with _shared_managers_lock:
+            manager = _shared_managers.get(config_path)
+            if manager is None:
+                manager = PostgreSQLManager(config_path)
+                _shared_managers[config_path] = manager
+    return manager
+
+def close_shared_managers() -> None:
+    """关闭所有共享数据库管理器的连接池（应用关闭时调用）"""
+    with _shared_managers_lock:
+        for manager in _shared_managers.values():
+            manager.close_all_connections()
+        _shared_managers.clear()